@@ -0,0 +1,29 @@
+from django.urls import path
+from django.urls.resolvers import URLPattern
+
+from .async_views import offload, subscriptions
+from .urls import router
+from .urls import urlpatterns as sync_urlpatterns
+
+app_name = 'api'
+
+ASYNC_ROUTES = (
+    'recipes-list',
+    'recipes-download-shopping-cart',
+    'ingredients-list',
+)
+
+urlpatterns = [
+    path('users/subscriptions/', subscriptions, name='subscriptions-list'),
+    *(
+        URLPattern(
+            pattern.pattern,
+            offload(pattern.callback),
+            pattern.default_args,
+            pattern.name
+        )
+        for pattern in router.urls
+        if pattern.name in ASYNC_ROUTES
+    ),
+    *sync_urlpatterns,
+]
@@ -0,0 +1,92 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
+
+from django.conf import settings
+from django.db import close_old_connections
+from recipes.models import Recipe
+
+from .metrics import current_metrics, track_queries
+from .serializers import get_recipes_limit
+from .views import SubscriptionsViewSet
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.ASYNC_ORM_WORKERS,
+    thread_name_prefix='orm'
+)
+fan_out_executor = ThreadPoolExecutor(
+    max_workers=settings.ASYNC_ORM_WORKERS,
+    thread_name_prefix='orm-fan-out'
+)
+
+
+def call_with_connection(func, *args, **kwargs):
+    close_old_connections()
+    metrics = current_metrics.get()
+    if metrics is None:
+        return func(*args, **kwargs)
+    with track_queries(metrics):
+        return func(*args, **kwargs)
+
+
+async def run_in_pool(func, *args, **kwargs):
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        executor,
+        partial(context.run, call_with_connection, func, *args, **kwargs)
+    )
+
+
+def render_response(response):
+    if hasattr(response, 'render') and not response.is_rendered:
+        response.render()
+    return response
+
+
+def offload(view):
+    def call_view(request, *args, **kwargs):
+        return render_response(view(request, *args, **kwargs))
+
+    @wraps(view)
+    async def async_view(request, *args, **kwargs):
+        return await run_in_pool(call_view, request, *args, **kwargs)
+
+    return async_view
+
+
+def get_author_recipes(author_id, limit):
+    return list(Recipe.objects.filter(
+        author_id=author_id
+    ).order_by('-pub_date', '-id')[:limit])
+
+
+def fan_out(func, calls):
+    futures = [
+        fan_out_executor.submit(
+            contextvars.copy_context().run, call_with_connection, func, *args
+        )
+        for args in calls
+    ]
+    return [future.result() for future in futures]
+
+
+class FanOutSubscriptionsViewSet(SubscriptionsViewSet):
+
+    def get_queryset(self):
+        return super().get_queryset().prefetch_related(None)
+
+    def paginate_queryset(self, queryset):
+        page = list(super().paginate_queryset(queryset))
+        limit = get_recipes_limit(self.request)
+        recipes = fan_out(get_author_recipes, (
+            (follow.following_id, limit) for follow in page
+        ))
+        for follow, author_recipes in zip(page, recipes):
+            follow.following.limited_recipes = author_recipes
+        return page
+
+
+subscriptions = offload(FanOutSubscriptionsViewSet.as_view(
+    {'get': 'list'}, basename='subscriptions'
+))
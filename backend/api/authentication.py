@@ -0,0 +1,105 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from users.models import User
+
+from .metrics import COUNTERS
+from .versions import bump_version, get_version
+
+SNAPSHOT_FIELDS = tuple(
+    field.attname for field in User._meta.concrete_fields
+    if field.attname in {
+        'id', 'username', 'email', 'first_name', 'last_name', 'role',
+        'is_active', 'is_staff', 'is_superuser',
+    }
+)
+
+
+def get_user_version_key(user_id):
+    return f'auth-user:{user_id}'
+
+
+class TokenCache:
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def invalidate_user(self, user_id):
+        with self.lock:
+            for key, (expires, (version, values)) in list(
+                self.entries.items()
+            ):
+                if values[0] == user_id:
+                    del self.entries[key]
+
+
+token_cache = TokenCache(settings.TOKEN_CACHE_SIZE, settings.TOKEN_CACHE_TTL)
+
+
+def forget_user(user_id):
+    bump_version(get_user_version_key(user_id))
+    token_cache.invalidate_user(user_id)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+
+    def get_user_values(self, key):
+        cached = token_cache.get(key)
+        if cached is not None:
+            version, values = cached
+            if version == get_version(get_user_version_key(values[0])):
+                COUNTERS['token_cache_hits'].inc()
+                return values
+        COUNTERS['token_cache_misses'].inc()
+        values = Token.objects.filter(key=key).values_list(
+            *(f'user__{field}' for field in SNAPSHOT_FIELDS)
+        ).first()
+        if values is None:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        token_cache.set(
+            key, (get_version(get_user_version_key(values[0])), values)
+        )
+        return values
+
+    def authenticate_credentials(self, key):
+        user = User.from_db(
+            DEFAULT_DB_ALIAS, SNAPSHOT_FIELDS, self.get_user_values(key)
+        )
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+        return user, Token(key=key, user=user)
@@ -0,0 +1,58 @@
+import hashlib
+
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags, quote_etag
+
+from .routers import primary_reads
+from .versions import CATALOGUE_VERSION_KEY, get_version
+
+CONDITIONAL_METHODS = ('GET', 'HEAD')
+
+
+class CatalogueCacheMixin:
+    rendered_lists = {}
+
+    @staticmethod
+    def get_catalogue_etag(request, version):
+        key = '\n'.join((
+            version,
+            request.get_full_path(),
+            request.META.get('HTTP_ACCEPT', ''),
+        ))
+        return quote_etag(hashlib.sha1(key.encode()).hexdigest())
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in CONDITIONAL_METHODS:
+            return super().dispatch(request, *args, **kwargs)
+        version = get_version(CATALOGUE_VERSION_KEY)
+        etag = self.get_catalogue_etag(request, version)
+        etags = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        if etag in etags or '*' in etags:
+            response = HttpResponseNotModified()
+        else:
+            self.catalogue_version = version
+            response = super().dispatch(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        response['ETag'] = etag
+        patch_cache_control(response, public=True, no_cache=True)
+        patch_vary_headers(response, ('Accept',))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params or request.accepted_renderer.format != 'json':
+            return super().list(request, *args, **kwargs)
+        cached = self.rendered_lists.get(self.basename)
+        if cached is None or cached[0] != self.catalogue_version:
+            with primary_reads():
+                response = super().list(request, *args, **kwargs)
+            cached = (
+                self.catalogue_version,
+                request.accepted_renderer.render(response.data)
+            )
+            self.rendered_lists[self.basename] = cached
+        return HttpResponse(
+            cached[1],
+            content_type=request.accepted_renderer.media_type
+        )
@@ -0,0 +1,87 @@
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Follow, User
+
+from .shopping_documents import bump_cart_versions
+
+LIST_COUNTERS = {
+    Favorite: 'favorites_count',
+    ShoppingCart: 'in_carts_count',
+}
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'in_carts_count', ShoppingCart, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'followers_count', Follow, 'following'),
+)
+
+
+def count_subquery(source, field):
+    return Coalesce(
+        Subquery(
+            source.objects.filter(
+                **{field: OuterRef('pk')}
+            ).order_by().values(field).annotate(
+                total=Count('pk')
+            ).values('total'),
+            output_field=IntegerField()
+        ),
+        0
+    )
+
+
+def reconcile(model, counter, source, field, start, stop):
+    actual = count_subquery(source, field)
+    return model.objects.filter(
+        pk__gte=start, pk__lt=stop
+    ).exclude(**{counter: actual}).update(**{counter: actual})
+
+
+def change_counter(model, pks, counter, delta):
+    model.objects.filter(pk__in=pks).update(
+        **{counter: Greatest(F(counter) + delta, 0)}
+    )
+
+
+def lock_user(user):
+    list(User.objects.select_for_update().filter(
+        pk=user.pk
+    ).order_by().values('pk'))
+
+
+def add_to_list(model, user, recipes):
+    with transaction.atomic():
+        lock_user(user)
+        existing = set(model.objects.filter(
+            recipe__in=recipes,
+            user=user
+        ).order_by().values_list('recipe_id', flat=True))
+        new_ids = [
+            recipe.id for recipe in recipes if recipe.id not in existing
+        ]
+        if not new_ids:
+            return
+        model.objects.bulk_create(
+            [model(recipe_id=recipe_id, user=user) for recipe_id in new_ids],
+            ignore_conflicts=True
+        )
+        change_counter(Recipe, new_ids, LIST_COUNTERS[model], 1)
+        if model is ShoppingCart:
+            bump_cart_versions([user.pk])
+
+
+def remove_from_list(model, user, recipe_ids):
+    with transaction.atomic():
+        lock_user(user)
+        items = model.objects.filter(
+            recipe_id__in=recipe_ids, user=user
+        ).order_by()
+        removed_ids = list(items.values_list('recipe_id', flat=True))
+        if not removed_ids:
+            return
+        items._raw_delete(items.db)
+        change_counter(Recipe, removed_ids, LIST_COUNTERS[model], -1)
+        if model is ShoppingCart:
+            bump_cart_versions([user.pk])
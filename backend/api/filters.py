@@ -1,6 +1,9 @@
+from django.db.models import Count, Exists, OuterRef, Subquery
 from django_filters.rest_framework import FilterSet, filters
+from django_filters.widgets import QueryArrayWidget
 
-from recipes.models import Ingredient, Recipe, Tag
+from .recipe_search import search_recipes
+from recipes.models import Ingredient, Recipe
 from users.models import User
 
 
@@ -12,17 +15,43 @@ class IngredientFilter(FilterSet):
         fields = ('name', )
 
 
+TAGS_ANY = 'any'
+TAGS_ALL = 'all'
+TAGS_MODES = (
+    (TAGS_ANY, 'Хотя бы один из тэгов'),
+    (TAGS_ALL, 'Все тэги'),
+)
+
+
 class AuthorTagFilter(FilterSet):
-    tags = filters.ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        queryset=Tag.objects.all(),
-        to_field_name='slug',
+    tags = filters.Filter(method='filter_tags', widget=QueryArrayWidget)
+    tags_mode = filters.ChoiceFilter(
+        choices=TAGS_MODES,
+        method='filter_tags_mode'
     )
     author = filters.ModelChoiceFilter(queryset=User.objects.all())
     is_favorited = filters.BooleanFilter(method='filter_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart'
     )
+    search = filters.CharFilter(method='filter_search')
+
+    def filter_tags(self, queryset, name, value):
+        slugs = set(value)
+        recipe_tags = Recipe.tags.through.objects.filter(
+            recipe=OuterRef('pk'),
+            tag__slug__in=slugs
+        )
+        if self.form.cleaned_data.get('tags_mode') != TAGS_ALL:
+            return queryset.filter(Exists(recipe_tags))
+        return queryset.annotate(matched_tags=Subquery(
+            recipe_tags.order_by().values('recipe').annotate(
+                total=Count('pk')
+            ).values('total')
+        )).filter(matched_tags=len(slugs))
+
+    def filter_tags_mode(self, queryset, name, value):
+        return queryset
 
     def filter_is_favorited(self, queryset, name, value):
         if value and not self.request.user.is_anonymous:
@@ -34,6 +63,12 @@ class AuthorTagFilter(FilterSet):
             return queryset.filter(shopping_carts__user=self.request.user)
         return queryset
 
+    def filter_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
     class Meta:
         model = Recipe
-        fields = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart')
+        fields = (
+            'tags', 'tags_mode', 'author', 'is_favorited',
+            'is_in_shopping_cart', 'search'
+        )
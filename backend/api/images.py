@@ -0,0 +1,132 @@
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.images import get_image_dimensions
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from drf_extra_fields.fields import Base64ImageField
+from PIL import Image
+from recipes.models import Recipe
+from rest_framework import serializers
+
+from .page_cache import invalidate_recipe_pages
+
+logger = logging.getLogger(__name__)
+
+MAX_IMAGE_SIZE = 5 * 1024 * 1024
+MAX_IMAGE_DIMENSION = 4096
+IMAGE_TOO_LARGE = 'Размер картинки не должен превышать 5 МБ!'
+IMAGE_TOO_WIDE = 'Стороны картинки не должны превышать 4096 пикселей!'
+
+RENDITIONS_ROOT = 'recipes/renditions'
+RENDITIONS = {
+    'thumbnail': (240, 240),
+    'card': (640, 640),
+    'full': (1280, 1280),
+}
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+
+executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'IMAGE_WORKERS', 2),
+    thread_name_prefix='image-renditions'
+)
+
+
+class RecipeImageField(Base64ImageField):
+
+    def to_internal_value(self, base64_data):
+        if (
+            isinstance(base64_data, str)
+            and len(base64_data) * 3 // 4 > MAX_IMAGE_SIZE
+        ):
+            raise serializers.ValidationError(IMAGE_TOO_LARGE)
+        image = super().to_internal_value(base64_data)
+        if image is not None:
+            width, height = get_image_dimensions(image)
+            if max(width or 0, height or 0) > MAX_IMAGE_DIMENSION:
+                raise serializers.ValidationError(IMAGE_TOO_WIDE)
+        return image
+
+
+def get_rendition_name(image_name, rendition, file_format):
+    stem = os.path.splitext(os.path.basename(image_name))[0]
+    return f'{RENDITIONS_ROOT}/{stem}_{rendition}.{file_format}'
+
+
+def get_rendition_urls(recipe, request=None):
+    if not recipe.renditions_ready or not recipe.image:
+        return None
+    return build_rendition_urls(recipe.image.name, request)
+
+
+def build_rendition_urls(image_name, request=None):
+    urls = {}
+    for rendition in RENDITIONS:
+        urls[rendition] = {}
+        for file_format in FORMATS:
+            url = default_storage.url(
+                get_rendition_name(image_name, rendition, file_format)
+            )
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            urls[rendition][file_format] = url
+    return urls
+
+
+def delete_renditions(image_name):
+    for rendition in RENDITIONS:
+        for file_format in FORMATS:
+            default_storage.delete(
+                get_rendition_name(image_name, rendition, file_format)
+            )
+
+
+def make_renditions(recipe_id, image_name, old_image_name=None):
+    with default_storage.open(image_name, 'rb') as file:
+        original = Image.open(file)
+        original.load()
+    if original.mode not in ('RGB', 'RGBA'):
+        original = original.convert('RGBA')
+    for rendition, size in RENDITIONS.items():
+        image = original.copy()
+        image.thumbnail(size, Image.LANCZOS)
+        for file_format, (pil_format, options) in FORMATS.items():
+            buffer = io.BytesIO()
+            if pil_format == 'JPEG' and image.mode != 'RGB':
+                image.convert('RGB').save(buffer, pil_format, **options)
+            else:
+                image.save(buffer, pil_format, **options)
+            name = get_rendition_name(image_name, rendition, file_format)
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            default_storage.save(name, ContentFile(buffer.getvalue()))
+    Recipe.objects.filter(
+        pk=recipe_id, image=image_name
+    ).update(renditions_ready=True)
+    invalidate_recipe_pages()
+    if old_image_name and old_image_name != image_name:
+        delete_renditions(old_image_name)
+
+
+def run_renditions(recipe_id, image_name, old_image_name=None):
+    close_old_connections()
+    try:
+        make_renditions(recipe_id, image_name, old_image_name)
+    except Exception:
+        logger.exception('Не удалось обработать картинку %s', image_name)
+    finally:
+        close_old_connections()
+
+
+def schedule_renditions(recipe, old_image_name=None):
+    recipe_id, image_name = recipe.pk, recipe.image.name
+    transaction.on_commit(lambda: executor.submit(
+        run_renditions, recipe_id, image_name, old_image_name
+    ))
@@ -0,0 +1,70 @@
+import threading
+from bisect import bisect_left
+from operator import itemgetter
+
+from recipes.models import Ingredient
+from recipes.search import normalize
+
+from .routers import primary_reads
+from .versions import CATALOGUE_VERSION_KEY, get_version
+
+SEARCH_LIMIT = 30
+
+
+class IngredientIndex:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.snapshot = None
+
+    def build(self, version):
+        with primary_reads():
+            ingredients = list(Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit'
+            ))
+        entries = sorted((
+            (normalize(name), {
+                'id': pk,
+                'name': name,
+                'measurement_unit': measurement_unit,
+            })
+            for pk, name, measurement_unit in ingredients
+        ), key=itemgetter(0))
+        keys = [key for key, _ in entries]
+        payloads = [payload for _, payload in entries]
+        self.snapshot = (version, keys, payloads)
+
+    def is_stale(self, version):
+        return self.snapshot is None or self.snapshot[0] != version
+
+    def get_snapshot(self, version=None):
+        if version is None:
+            version = get_version(CATALOGUE_VERSION_KEY)
+        if self.is_stale(version):
+            with self.lock:
+                if self.is_stale(version):
+                    self.build(version)
+        return self.snapshot
+
+    def search(self, query, version=None, limit=SEARCH_LIMIT):
+        _, keys, payloads = self.get_snapshot(version)
+        query = normalize(query)
+        result = []
+        index = bisect_left(keys, query)
+        while (
+            index < len(keys)
+            and keys[index].startswith(query)
+            and len(result) < limit
+        ):
+            result.append(payloads[index])
+            index += 1
+        if len(result) < limit:
+            for key, payload in zip(keys, payloads):
+                if query in key and not key.startswith(query):
+                    result.append(payload)
+                    if len(result) == limit:
+                        break
+        return result
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,463 @@
+import json
+import tempfile
+import time
+from collections import namedtuple
+from itertools import count
+
+from api.synthetic import (SYNTHETIC_IMAGE, SyntheticDataGenerator,
+                           create_ingredients)
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import (CaptureQueriesContext, override_settings,
+                               setup_test_environment,
+                               teardown_test_environment)
+from django.urls import get_resolver, reverse
+from recipes.models import Ingredient, Recipe, Tag
+from rest_framework.authtoken.models import Token
+from users.models import Follow, User
+
+Endpoint = namedtuple(
+    'Endpoint', 'name method url anonymous data undo cached',
+    defaults=(None, None, False)
+)
+
+BENCHMARK_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'benchmark-api',
+    },
+    'versions': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'benchmark-api-versions',
+    },
+}
+PERCENTILES = (50, 95, 99)
+UNBENCHMARKED_ROUTES = {
+    'api-root', 'user-activation', 'user-resend-activation',
+    'user-reset-password', 'user-reset-password-confirm',
+    'user-reset-username', 'user-reset-username-confirm',
+    'user-set-username',
+    'users-list', 'users-detail', 'users-me',
+}
+BENCHMARK_EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+BENCHMARK_PASSWORD = 'benchmark-password'
+BENCHMARK_IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAA'
+    'DUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=='
+)
+DATASET_OPTIONS = (
+    'users', 'recipes', 'tags', 'ingredients', 'amounts',
+    'follows', 'favorites', 'carts',
+)
+
+
+def percentile(values, rank):
+    ordered = sorted(values)
+    index = max(0, round(rank / 100 * len(ordered) + 0.5) - 1)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+def send(client, method, url, data=None):
+    if data is None:
+        return getattr(client, method)(url)
+    return getattr(client, method)(
+        url, json.dumps(data), content_type='application/json'
+    )
+
+
+def send_back(method):
+    def undo(client, url, data, response):
+        send(client, method, url, data)
+    return undo
+
+
+def get_route_names():
+    resolver = get_resolver().namespace_dict['api'][1]
+    return {name for name in resolver.reverse_dict if isinstance(name, str)}
+
+
+def get_recipe_data(ids):
+    return {
+        'ingredients': [
+            {'id': ingredient, 'amount': 10}
+            for ingredient in ids['ingredients']
+        ],
+        'tags': [ids['tag']],
+        'image': BENCHMARK_IMAGE,
+        'name': 'Рецепт для замера',
+        'text': 'Рецепт, созданный при замере производительности',
+        'cooking_time': 10,
+    }
+
+
+def get_write_endpoints(ids, user, token):
+    own_recipe = {'pk': ids['own_recipe']}
+    recipe_data = get_recipe_data(ids)
+    batch = {'recipes': ids['batch']}
+    usernames = (f'benchmark{number}' for number in count())
+
+    def create_recipe():
+        recipe = Recipe.objects.create(
+            author=user, name='Рецепт для удаления', text='-',
+            cooking_time=1, image=SYNTHETIC_IMAGE
+        )
+        return reverse('api:recipes-detail', kwargs={'pk': recipe.pk})
+
+    def delete_recipe(client, url, data, response):
+        Recipe.objects.filter(pk=response.json()['id']).delete()
+
+    def registration():
+        username = next(usernames)
+        return {
+            'email': f'{username}@example.com', 'username': username,
+            'first_name': 'Бенчмарк', 'last_name': 'Бенчмарк',
+            'password': BENCHMARK_PASSWORD,
+        }
+
+    def delete_user(client, url, data, response):
+        User.objects.filter(username=data['username']).delete()
+
+    def restore_password(client, url, data, response):
+        user.set_password(BENCHMARK_PASSWORD)
+        user.save(update_fields=['password'])
+
+    def restore_token(client, url, data, response):
+        Token.objects.get_or_create(user=user, key=token.key)
+
+    return (
+        Endpoint('recipes-list', 'post', reverse('api:recipes-list'), False,
+                 recipe_data, delete_recipe),
+        Endpoint('recipes-detail', 'patch',
+                 reverse('api:recipes-detail', kwargs=own_recipe), False,
+                 {
+                     key: value for key, value in recipe_data.items()
+                     if key != 'image'
+                 }),
+        Endpoint('recipes-detail', 'delete', create_recipe, False),
+        Endpoint('recipes-favorite-batch', 'post',
+                 reverse('api:recipes-favorite-batch'), False, batch,
+                 send_back('delete')),
+        Endpoint('recipes-favorite-batch', 'delete',
+                 reverse('api:recipes-favorite-batch'), False, batch,
+                 send_back('post')),
+        Endpoint('recipes-shopping-cart-batch', 'post',
+                 reverse('api:recipes-shopping-cart-batch'), False, batch,
+                 send_back('delete')),
+        Endpoint('recipes-shopping-cart-batch', 'delete',
+                 reverse('api:recipes-shopping-cart-batch'), False, batch,
+                 send_back('post')),
+        Endpoint('user-list', 'post', reverse('api:user-list'), True,
+                 registration, delete_user),
+        Endpoint('user-set-password', 'post',
+                 reverse('api:user-set-password'), False,
+                 {
+                     'current_password': BENCHMARK_PASSWORD,
+                     'new_password': 'benchmark-new-password',
+                 },
+                 restore_password),
+        Endpoint('login', 'post', reverse('api:login'), True,
+                 {'email': user.email, 'password': BENCHMARK_PASSWORD}),
+        Endpoint('logout', 'post', reverse('api:logout'), False,
+                 undo=restore_token),
+    )
+
+
+def get_endpoints(ids, user, token):
+    recipe = {'pk': ids['recipe']}
+    return (
+        Endpoint('recipes-list', 'get', reverse('api:recipes-list'), True,
+                 cached=True),
+        Endpoint('recipes-list limit=50', 'get',
+                 reverse('api:recipes-list') + '?limit=50', True,
+                 cached=True),
+        Endpoint('recipes-list tags', 'get',
+                 reverse('api:recipes-list') + f'?tags={ids["tag_slug"]}',
+                 True, cached=True),
+        Endpoint('recipes-list cursor', 'get',
+                 reverse('api:recipes-list') + '?cursor=', True, cached=True),
+        Endpoint('recipes-list is_favorited', 'get',
+                 reverse('api:recipes-list') + '?is_favorited=1', False),
+        Endpoint('recipes-detail', 'get',
+                 reverse('api:recipes-detail', kwargs=recipe), True,
+                 cached=True),
+        Endpoint('recipes-favorite', 'post',
+                 reverse('api:recipes-favorite', kwargs=recipe), False,
+                 undo=send_back('delete')),
+        Endpoint('recipes-favorite', 'delete',
+                 reverse('api:recipes-favorite', kwargs=recipe), False,
+                 undo=send_back('post')),
+        Endpoint('recipes-shopping-cart', 'post',
+                 reverse('api:recipes-shopping-cart', kwargs=recipe), False,
+                 undo=send_back('delete')),
+        Endpoint('recipes-shopping-cart', 'delete',
+                 reverse('api:recipes-shopping-cart', kwargs=recipe), False,
+                 undo=send_back('post')),
+        Endpoint('recipes-download-shopping-cart', 'get',
+                 reverse('api:recipes-download-shopping-cart'), False),
+        Endpoint('tags-list', 'get', reverse('api:tags-list'), True),
+        Endpoint('tags-detail', 'get',
+                 reverse('api:tags-detail', kwargs={'pk': ids['tag']}), True),
+        Endpoint('ingredients-list', 'get',
+                 reverse('api:ingredients-list'), True),
+        Endpoint('ingredients-list name', 'get',
+                 reverse('api:ingredients-list') + '?name=ингр', True),
+        Endpoint('ingredients-detail', 'get',
+                 reverse('api:ingredients-detail',
+                         kwargs={'pk': ids['ingredients'][0]}), True),
+        Endpoint('user-list', 'get', reverse('api:user-list'), True),
+        Endpoint('user-detail', 'get',
+                 reverse('api:user-detail', kwargs={'id': ids['user']}),
+                 False),
+        Endpoint('user-me', 'get', reverse('api:user-me'), False),
+        Endpoint('users-subscribe', 'post',
+                 reverse('api:users-subscribe', kwargs={'pk': ids['user']}),
+                 False, undo=send_back('delete')),
+        Endpoint('users-subscribe', 'delete',
+                 reverse('api:users-subscribe', kwargs={'pk': ids['user']}),
+                 False, undo=send_back('post')),
+        Endpoint('subscriptions-list', 'get',
+                 reverse('api:subscriptions-list'), False),
+        Endpoint('subscriptions-detail', 'get',
+                 reverse('api:subscriptions-detail',
+                         kwargs={'pk': ids['follow']}), False),
+        Endpoint('metrics', 'get', reverse('api:metrics'), False),
+        *get_write_endpoints(ids, user, token),
+    )
+
+
+class Command(BaseCommand):
+    help = ('benchmarking API endpoints on a synthetic dataset in a test '
+            'database; run with DB_ENGINE=django.db.backends.sqlite3 to use '
+            'an in-memory SQLite database')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', default=50, type=int)
+        parser.add_argument('--recipes', default=300, type=int)
+        parser.add_argument('--tags', default=6, type=int)
+        parser.add_argument('--ingredients', default=300, type=int)
+        parser.add_argument('--amounts', default=8, type=int)
+        parser.add_argument('--follows', default=5, type=int,
+                            help='subscriptions per user')
+        parser.add_argument('--favorites', default=20, type=int,
+                            help='favorites per user')
+        parser.add_argument('--carts', default=5, type=int,
+                            help='shopping cart entries per user')
+        parser.add_argument('--seed', default=0, type=int)
+        parser.add_argument('--requests', default=50, type=int)
+        parser.add_argument('--output', help='file for the JSON report')
+        parser.add_argument('--baseline',
+                            help='JSON report to compare this run with')
+        parser.add_argument('--compare', nargs=2,
+                            metavar=('BASELINE', 'REPORT'),
+                            help='compare two JSON reports without a run')
+        parser.add_argument('--threshold', default=0.1, type=float,
+                            help='allowed relative slowdown, 0.1 is 10%%')
+
+    def handle(self, *args, **options):
+        if options['compare']:
+            baseline, report = (
+                self.load_report(path) for path in options['compare']
+            )
+        else:
+            report = self.run(options)
+            self.write_table(report)
+            if options['output']:
+                with open(options['output'], 'w', encoding='utf-8') as f:
+                    json.dump(report, f, ensure_ascii=False, indent=2)
+            if not options['baseline']:
+                return
+            baseline = self.load_report(options['baseline'])
+        if self.compare(baseline, report, options['threshold']):
+            raise CommandError('Обнаружены регрессии производительности')
+        self.stdout.write(self.style.SUCCESS('Регрессий не обнаружено'))
+
+    @staticmethod
+    def load_report(path):
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise CommandError(f'Файл {path} не найден')
+
+    def run(self, options):
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                with override_settings(
+                    CACHES=BENCHMARK_CACHES,
+                    MEDIA_ROOT=directory,
+                    SHOPPING_LISTS_ROOT=directory,
+                    EMAIL_BACKEND=BENCHMARK_EMAIL_BACKEND,
+                ):
+                    return self.run_benchmark(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def run_benchmark(self, options):
+        dataset = {name: options[name] for name in DATASET_OPTIONS}
+        create_ingredients(options['ingredients'], options['seed'])
+        SyntheticDataGenerator(seed=options['seed']).generate(
+            users=options['users'],
+            recipes=options['recipes'],
+            tags=options['tags'],
+            amounts=options['amounts'],
+            follows=options['follows'] * options['users'],
+            favorites=options['favorites'] * options['users'],
+            carts=options['carts'] * options['users'],
+        )
+        user = User.objects.order_by('id').first()
+        user.is_staff = True
+        user.set_password(BENCHMARK_PASSWORD)
+        user.save()
+        token = Token.objects.create(user=user)
+        ids = self.get_ids(user)
+        anonymous = Client()
+        clients = {
+            'anonymous': anonymous,
+            'anonymous uncached': anonymous,
+            'authenticated': Client(HTTP_AUTHORIZATION=f'Token {token.key}'),
+        }
+        endpoints = get_endpoints(ids, user, token)
+        self.warn_unbenchmarked(endpoints)
+        results = {}
+        for endpoint in endpoints:
+            for mode, client in clients.items():
+                if not self.is_measured(endpoint, mode):
+                    continue
+                key = f'{endpoint.name} {endpoint.method.upper()} {mode}'
+                results[key] = self.measure(
+                    client, endpoint, options['requests'],
+                    uncached=mode == 'anonymous uncached'
+                )
+        return {
+            'dataset': dict(dataset, seed=options['seed']),
+            'requests': options['requests'],
+            'results': results,
+        }
+
+    @staticmethod
+    def get_ids(user):
+        followed = Follow.objects.filter(follower=user).values('following')
+        tag = Tag.objects.order_by('id').first()
+        free_recipes = Recipe.objects.exclude(
+            favorites__user=user
+        ).exclude(shopping_carts__user=user).values_list('id', flat=True)
+        own_recipe = Recipe.objects.filter(author=user).first()
+        if own_recipe is None:
+            own_recipe = Recipe.objects.create(
+                author=user, name='Рецепт для изменения', text='-',
+                cooking_time=1, image=SYNTHETIC_IMAGE
+            )
+        return {
+            'recipe': free_recipes[0],
+            'batch': list(free_recipes[1:11]),
+            'own_recipe': own_recipe.id,
+            'tag': tag.id,
+            'tag_slug': tag.slug,
+            'ingredients': list(Ingredient.objects.values_list(
+                'id', flat=True
+            )[:3]),
+            'user': User.objects.exclude(id=user.id).exclude(
+                id__in=followed
+            ).values_list('id', flat=True).first(),
+            'follow': Follow.objects.filter(follower=user).values_list(
+                'id', flat=True
+            ).first(),
+        }
+
+    @staticmethod
+    def is_measured(endpoint, mode):
+        if mode == 'authenticated':
+            return True
+        if mode == 'anonymous uncached':
+            return endpoint.cached
+        return endpoint.anonymous
+
+    def warn_unbenchmarked(self, endpoints):
+        missing = get_route_names() - UNBENCHMARKED_ROUTES - {
+            endpoint.name.split()[0] for endpoint in endpoints
+        }
+        if missing:
+            self.stdout.write(self.style.WARNING(
+                'Маршруты без замера: ' + ', '.join(sorted(missing))
+            ))
+
+    @staticmethod
+    def request(client, method, url, data):
+        response = send(client, method, url, data)
+        if response.streaming:
+            size = sum(len(chunk) for chunk in response.streaming_content)
+        else:
+            size = len(response.content)
+        return response, size
+
+    def measure(self, client, endpoint, requests, uncached=False):
+        latencies = []
+        queries = []
+        for _ in range(requests):
+            url = endpoint.url() if callable(endpoint.url) else endpoint.url
+            data = (
+                endpoint.data() if callable(endpoint.data) else endpoint.data
+            )
+            if uncached:
+                cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                response, size = self.request(
+                    client, endpoint.method, url, data
+                )
+                latencies.append((time.perf_counter() - start) * 1000)
+            queries.append(len(context))
+            if endpoint.undo is not None:
+                endpoint.undo(client, url, data, response)
+        result = {
+            f'p{rank}': round(percentile(latencies, rank), 3)
+            for rank in PERCENTILES
+        }
+        result.update(
+            queries=max(queries),
+            bytes=size,
+            status=response.status_code,
+        )
+        return result
+
+    def write_table(self, report):
+        header = (f'{"endpoint":<52}{"status":>7}{"p50 ms":>10}'
+                  f'{"p95 ms":>10}{"p99 ms":>10}{"queries":>9}{"bytes":>10}')
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for key, result in report['results'].items():
+            self.stdout.write(
+                f'{key:<52}{result["status"]:>7}{result["p50"]:>10.2f}'
+                f'{result["p95"]:>10.2f}{result["p99"]:>10.2f}'
+                f'{result["queries"]:>9}{result["bytes"]:>10}'
+            )
+
+    def compare(self, baseline, report, threshold):
+        regressions = 0
+        for key, result in report['results'].items():
+            previous = baseline['results'].get(key)
+            if previous is None:
+                continue
+            problems = [
+                f'{metric} {previous[metric]} -> {result[metric]}'
+                for metric in ('p50', 'p95', 'bytes')
+                if result[metric] > previous[metric] * (1 + threshold)
+            ]
+            if result['queries'] > previous['queries']:
+                problems.append(
+                    f'queries {previous["queries"]} -> {result["queries"]}'
+                )
+            if problems:
+                regressions += 1
+                self.stdout.write(self.style.ERROR(
+                    f'{key}: ' + ', '.join(problems)
+                ))
+        return regressions
@@ -0,0 +1,140 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from api.management.commands.benchmark_api import PERCENTILES, percentile
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+from users.models import Follow, User
+
+SERVERS = {
+    'wsgi': ('False', ('foodgram.wsgi:application',)),
+    'asgi': ('True', (
+        'foodgram.asgi:application',
+        '--worker-class', 'uvicorn.workers.UvicornWorker',
+    )),
+}
+ENDPOINTS = (
+    ('recipes-list', '/api/recipes/?limit=50'),
+    ('ingredients-list name', '/api/ingredients/?name=са'),
+    ('recipes-download-shopping-cart', '/api/recipes/download_shopping_cart/'),
+    ('subscriptions-list', '/api/users/subscriptions/?recipes_limit=6'),
+)
+STARTUP_TIMEOUT = 30
+
+
+class Command(BaseCommand):
+    help = ('measuring throughput of the WSGI and ASGI servers under '
+            'concurrent load on the configured database')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modes', nargs='+', choices=SERVERS,
+                            default=list(SERVERS))
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--concurrency', type=int, default=64)
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--output')
+
+    def handle(self, *args, **options):
+        token = self.get_token()
+        base_url = f'http://127.0.0.1:{options["port"]}'
+        report = {}
+        for mode in options['modes']:
+            server = self.start_server(mode, options)
+            try:
+                self.wait_until_ready(server, base_url)
+                report[mode] = {
+                    name: self.load(
+                        base_url + url, token, options['concurrency'],
+                        options['requests']
+                    )
+                    for name, url in ENDPOINTS
+                }
+            finally:
+                server.terminate()
+                server.wait(STARTUP_TIMEOUT)
+        self.print_report(report)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(report, file, indent=2)
+
+    def get_token(self):
+        follow = Follow.objects.order_by('id').first()
+        user = follow.follower if follow else User.objects.first()
+        if user is None:
+            raise CommandError('Сначала заполните базу командой seed_foodgram')
+        return Token.objects.get_or_create(user=user)[0].key
+
+    def start_server(self, mode, options):
+        async_views, application = SERVERS[mode]
+        return subprocess.Popen(
+            [
+                sys.executable, '-m', 'gunicorn', *application,
+                '--bind', f'127.0.0.1:{options["port"]}',
+                '--workers', str(options['workers']),
+                '--log-level', 'warning',
+            ],
+            cwd=settings.BASE_DIR,
+            env={**os.environ, 'ASYNC_VIEWS': async_views},
+        )
+
+    def wait_until_ready(self, server, base_url):
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError('Сервер завершился при запуске')
+            try:
+                requests.get(base_url + '/api/tags/', timeout=5)
+                return
+            except requests.RequestException:
+                time.sleep(0.2)
+        raise CommandError('Сервер не запустился')
+
+    def load(self, url, token, concurrency, total):
+        sessions = threading.local()
+        headers = {'Authorization': f'Token {token}'}
+
+        def send(_):
+            if not hasattr(sessions, 'session'):
+                sessions.session = requests.Session()
+            start = time.perf_counter()
+            response = sessions.session.get(url, headers=headers)
+            return time.perf_counter() - start, response.status_code
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            results = list(pool.map(send, range(total)))
+        elapsed = time.perf_counter() - start
+        durations = [duration for duration, _ in results]
+        return {
+            'rps': total / elapsed,
+            **{
+                f'p{rank}_ms': percentile(durations, rank) * 1000
+                for rank in PERCENTILES
+            },
+            'errors': sum(status >= 400 for _, status in results),
+        }
+
+    def print_report(self, report):
+        self.stdout.write(
+            f'{"mode":5} {"endpoint":32} {"req/s":>8} '
+            + ' '.join(f'{"p" + str(rank):>8}' for rank in PERCENTILES)
+            + f' {"errors":>6}'
+        )
+        for mode, endpoints in report.items():
+            for name, result in endpoints.items():
+                self.stdout.write(
+                    f'{mode:5} {name:32} {result["rps"]:8.1f} '
+                    + ' '.join(
+                        f'{result[f"p{rank}_ms"]:8.1f}'
+                        for rank in PERCENTILES
+                    )
+                    + f' {result["errors"]:6}'
+                )
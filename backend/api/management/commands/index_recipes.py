@@ -0,0 +1,29 @@
+from api.recipe_search import index_recipes
+from django.core.management.base import BaseCommand
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'rebuilding the recipe search index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        recipes = Recipe.objects.order_by('id').values_list(
+            'id', 'name', 'text'
+        )
+        chunk = []
+        done = 0
+        for recipe in recipes.iterator(chunk_size=chunk_size):
+            chunk.append(recipe)
+            if len(chunk) == chunk_size:
+                index_recipes(chunk)
+                done += len(chunk)
+                chunk = []
+        index_recipes(chunk)
+        done += len(chunk)
+        self.stdout.write(
+            self.style.SUCCESS(f'Проиндексировано рецептов: {done}')
+        )
@@ -1,39 +1,104 @@
+import csv
 import json
 import os
+from itertools import islice
 
 from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
-from django.db.utils import IntegrityError
+from django.db import transaction
 
+from api.versions import CATALOGUE_VERSION_KEY, bump_version
 from recipes.models import Ingredient
 
 DATA_ROOT = os.path.join(settings.BASE_DIR, 'data')
+CHUNK_SIZE = 64 * 1024
+BATCH_SIZE = 1000
+JSON_SEPARATORS = ' \t\r\n,'
+JSON_ERROR_CONTEXT = 50
+
+
+def iter_json(file):
+    decoder = json.JSONDecoder()
+    buffer = ''
+    started = False
+    for chunk in iter(lambda: file.read(CHUNK_SIZE), ''):
+        buffer += chunk
+        position = 0
+        while True:
+            while (position < len(buffer)
+                   and buffer[position] in JSON_SEPARATORS):
+                position += 1
+            if not started and buffer[position:position + 1] == '[':
+                started = True
+                position += 1
+                continue
+            if buffer[position:position + 1] in ('', ']'):
+                break
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                break
+            yield item['name'], item['measurement_unit']
+        buffer = buffer[position:]
+    rest = buffer.strip(JSON_SEPARATORS)
+    if rest != (']' if started else ''):
+        raise CommandError(
+            f'Некорректный json: {rest[:JSON_ERROR_CONTEXT]!r}'
+        )
+
+
+def iter_csv(file):
+    for number, row in enumerate(csv.reader(file), 1):
+        if not row:
+            continue
+        if len(row) < 2:
+            raise CommandError(f'Некорректная строка {number} в csv: {row!r}')
+        yield row[0], row[1]
+
+
+READERS = {
+    '.json': iter_json,
+    '.csv': iter_csv,
+}
 
 
 class Command(BaseCommand):
-    help = 'loading ingredients from data in json'
+    help = 'loading ingredients from data in json or csv'
 
     def add_arguments(self, parser):
         parser.add_argument('filename', default='ingredients.json', nargs='?',
                             type=str)
+        parser.add_argument('--batch-size', default=BATCH_SIZE, type=int)
 
     def handle(self, *args, **options):
+        reader = READERS.get(os.path.splitext(options['filename'])[1])
+        if reader is None:
+            raise CommandError('Поддерживаются только файлы json и csv')
+        batch_size = options['batch_size']
+        if batch_size <= 0:
+            raise CommandError('--batch-size должен быть больше нуля')
         try:
             with open(os.path.join(DATA_ROOT, options['filename']), 'r',
-                      encoding='utf-8') as f:
-                data = json.load(f)
-                for ingredient in data:
-                    try:
-                        Ingredient.objects.create(
-                            name=ingredient["name"],
-                            measurement_unit=ingredient["measurement_unit"]
-                        )
-                    except IntegrityError:
-                        print(f'Ингридиет {ingredient["name"]} '
-                              f'{ingredient["measurement_unit"]} '
-                              f'уже есть в базе')
-                self.stdout.write(
-                    self.style.SUCCESS('Все данные загружены')
-                )
+                      encoding='utf-8') as f, transaction.atomic():
+                before = Ingredient.objects.count()
+                total = 0
+                rows = reader(f)
+                while True:
+                    batch = [
+                        Ingredient(name=name, measurement_unit=unit)
+                        for name, unit in islice(rows, batch_size)
+                    ]
+                    if not batch:
+                        break
+                    Ingredient.objects.bulk_create(
+                        batch, ignore_conflicts=True
+                    )
+                    total += len(batch)
+                inserted = Ingredient.objects.count() - before
         except FileNotFoundError:
             raise CommandError('Файл отсутствует в директории data')
+        bump_version(CATALOGUE_VERSION_KEY)
+        self.stdout.write(self.style.SUCCESS(
+            f'Все данные загружены: добавлено {inserted}, '
+            f'пропущено {total - inserted}'
+        ))
@@ -0,0 +1,21 @@
+from api.images import make_renditions
+from django.core.management.base import BaseCommand
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'making resized copies of recipe images'
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.filter(
+            renditions_ready=False
+        ).exclude(image='').values_list('id', 'image')
+        done = 0
+        for recipe_id, image_name in recipes.iterator():
+            try:
+                make_renditions(recipe_id, image_name)
+            except (OSError, ValueError) as error:
+                self.stderr.write(f'{image_name}: {error}')
+                continue
+            done += 1
+        self.stdout.write(self.style.SUCCESS(f'Обработано картинок: {done}'))
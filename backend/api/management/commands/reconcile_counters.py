@@ -0,0 +1,27 @@
+from api.counters import COUNTERS, reconcile
+from django.core.management.base import BaseCommand
+from django.db.models import Max, Min
+
+
+class Command(BaseCommand):
+    help = 'repairing drift of recipe and user counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        for model, counter, source, field in COUNTERS:
+            bounds = model.objects.aggregate(start=Min('pk'), stop=Max('pk'))
+            if bounds['start'] is None:
+                continue
+            fixed = 0
+            for start in range(bounds['start'], bounds['stop'] + 1,
+                               chunk_size):
+                fixed += reconcile(
+                    model, counter, source, field, start, start + chunk_size
+                )
+            self.stdout.write(
+                f'{model._meta.model_name}.{counter}: исправлено {fixed}'
+            )
+        self.stdout.write(self.style.SUCCESS('Счётчики сверены'))
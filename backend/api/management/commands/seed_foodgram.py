@@ -0,0 +1,59 @@
+import time
+
+from api.page_cache import invalidate_recipe_pages
+from api.synthetic import CHUNK_SIZE, SKEW, SyntheticDataGenerator
+from api.versions import CATALOGUE_VERSION_KEY, bump_version
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from recipes.models import Ingredient
+
+
+class Command(BaseCommand):
+    help = ('generating synthetic users, recipes, subscriptions, favorites '
+            'and shopping carts with bulk inserts')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', default=1000, type=int)
+        parser.add_argument('--recipes', default=10000, type=int)
+        parser.add_argument('--tags', default=10, type=int)
+        parser.add_argument('--amounts', default=8, type=int,
+                            help='ingredients per recipe')
+        parser.add_argument('--follows', default=20000, type=int)
+        parser.add_argument('--favorites', default=100000, type=int)
+        parser.add_argument('--carts', default=20000, type=int)
+        parser.add_argument('--seed', default=0, type=int)
+        parser.add_argument('--skew', default=SKEW, type=float,
+                            help='popularity skew, 1 is uniform')
+        parser.add_argument('--chunk-size', default=CHUNK_SIZE, type=int)
+
+    def handle(self, *args, **options):
+        if options['users'] <= 0 or options['chunk_size'] <= 0:
+            raise CommandError('--users и --chunk-size должны быть больше 0')
+        if options['tags'] <= 0:
+            raise CommandError('--tags должен быть больше 0')
+        if not Ingredient.objects.exists():
+            raise CommandError(
+                'Сначала загрузите ингредиенты командой load_ingredients'
+            )
+        start = time.perf_counter()
+        generator = SyntheticDataGenerator(
+            seed=options['seed'],
+            skew=options['skew'],
+            chunk_size=options['chunk_size'],
+            progress=self.stdout.write,
+        )
+        generator.generate(
+            users=options['users'],
+            recipes=options['recipes'],
+            tags=options['tags'],
+            amounts=options['amounts'],
+            follows=options['follows'],
+            favorites=options['favorites'],
+            carts=options['carts'],
+        )
+        call_command('reconcile_counters', stdout=self.stdout)
+        bump_version(CATALOGUE_VERSION_KEY)
+        invalidate_recipe_pages()
+        self.stdout.write(self.style.SUCCESS(
+            f'Данные созданы за {time.perf_counter() - start:.1f} с'
+        ))
@@ -0,0 +1,179 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250)
+
+current_metrics = ContextVar('current_metrics', default=None)
+
+
+class RequestMetrics:
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+
+@contextmanager
+def track_queries(metrics):
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(metrics))
+        yield
+
+
+@contextmanager
+def serializer_timer():
+    metrics = current_metrics.get()
+    if metrics is None or metrics.serializer_depth:
+        yield
+        return
+    metrics.serializer_depth += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.serializer_time += time.perf_counter() - start
+        metrics.serializer_depth -= 1
+
+
+class TimedSerializerMixin:
+
+    def to_representation(self, instance):
+        with serializer_timer():
+            return super().to_representation(instance)
+
+
+class Histogram:
+
+    def __init__(self, name, description, buckets, label_names):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self.label_names = label_names
+        self.lock = threading.Lock()
+        self.series = {}
+
+    def observe(self, labels, value):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [
+                    [0] * (len(self.buckets) + 1), 0.0
+                ]
+            series[0][index] += 1
+            series[1] += value
+
+    def expose(self):
+        lines = [
+            f'# HELP {self.name} {self.description}',
+            f'# TYPE {self.name} histogram',
+        ]
+        with self.lock:
+            series = sorted(
+                (labels, list(counts), total)
+                for labels, (counts, total) in self.series.items()
+            )
+        for labels, counts, total in series:
+            label_text = ','.join(
+                f'{name}="{value}"'
+                for name, value in zip(self.label_names, labels)
+            )
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append(
+                    f'{self.name}_bucket{{{label_text},le="{bound}"}} '
+                    f'{cumulative}'
+                )
+            lines.append(f'{self.name}_sum{{{label_text}}} {total}')
+            lines.append(f'{self.name}_count{{{label_text}}} {cumulative}')
+        return lines
+
+
+class Counter:
+
+    def __init__(self, name, description):
+        self.name = name
+        self.description = description
+        self.lock = threading.Lock()
+        self.value = 0
+
+    def inc(self):
+        with self.lock:
+            self.value += 1
+
+    def expose(self):
+        return [
+            f'# HELP {self.name} {self.description}',
+            f'# TYPE {self.name} counter',
+            f'{self.name} {self.value}',
+        ]
+
+
+LABELS = ('route', 'method')
+HISTOGRAMS = {
+    'view': Histogram(
+        'foodgram_request_duration_seconds',
+        'Total time spent in the view stack.', DURATION_BUCKETS, LABELS
+    ),
+    'db': Histogram(
+        'foodgram_db_duration_seconds',
+        'Time spent executing database queries.', DURATION_BUCKETS, LABELS
+    ),
+    'serializer': Histogram(
+        'foodgram_serializer_duration_seconds',
+        'Time spent in top-level serializers.', DURATION_BUCKETS, LABELS
+    ),
+    'queries': Histogram(
+        'foodgram_db_queries',
+        'Database queries per request.', QUERY_BUCKETS, LABELS
+    ),
+}
+
+
+COUNTERS = {
+    'token_cache_hits': Counter(
+        'foodgram_token_cache_hits_total',
+        'Authenticated requests served from the token cache.'
+    ),
+    'token_cache_misses': Counter(
+        'foodgram_token_cache_misses_total',
+        'Authenticated requests that looked the token up in the database.'
+    ),
+}
+
+
+def record(route, method, metrics, total):
+    labels = (route, method)
+    HISTOGRAMS['view'].observe(labels, total)
+    HISTOGRAMS['db'].observe(labels, metrics.db_time)
+    HISTOGRAMS['serializer'].observe(labels, metrics.serializer_time)
+    HISTOGRAMS['queries'].observe(labels, metrics.queries)
+
+
+def expose():
+    lines = []
+    for histogram in HISTOGRAMS.values():
+        lines.extend(histogram.expose())
+    for counter in COUNTERS.values():
+        lines.extend(counter.expose())
+    return '\n'.join(lines) + '\n'
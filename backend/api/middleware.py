@@ -0,0 +1,93 @@
+import asyncio
+import hashlib
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+
+from .metrics import RequestMetrics, current_metrics, record, track_queries
+from .routers import replica_reads
+
+
+class SyncAndAsyncMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        with self.wrap(request) as state:
+            response = self.get_response(request)
+        return self.process_response(request, response, state)
+
+    async def __acall__(self, request):
+        with self.wrap(request) as state:
+            response = await self.get_response(request)
+        return self.process_response(request, response, state)
+
+
+class MetricsMiddleware(SyncAndAsyncMiddleware):
+
+    @contextmanager
+    def wrap(self, request):
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            with track_queries(metrics):
+                yield metrics, time.perf_counter()
+        finally:
+            current_metrics.reset(token)
+
+    def process_response(self, request, response, state):
+        metrics, start = state
+        total = time.perf_counter() - start
+        match = request.resolver_match
+        route = match.url_name if match and match.url_name else 'unresolved'
+        record(route, request.method, metrics, total)
+        response['Server-Timing'] = ', '.join((
+            f'db;desc="{metrics.queries} queries";'
+            f'dur={metrics.db_time * 1000:.2f}',
+            f'serializer;dur={metrics.serializer_time * 1000:.2f}',
+            f'view;dur={total * 1000:.2f}',
+        ))
+        return response
+
+
+def get_sticky_key(request):
+    credentials = request.META.get('HTTP_AUTHORIZATION') or (
+        request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    )
+    if not credentials:
+        return None
+    return 'db-sticky:' + hashlib.sha1(credentials.encode()).hexdigest()
+
+
+class ReplicaMiddleware(SyncAndAsyncMiddleware):
+
+    @contextmanager
+    def wrap(self, request):
+        if not settings.REPLICA_DATABASES:
+            yield None
+            return
+        key = get_sticky_key(request)
+        token = replica_reads.set(
+            request.method in SAFE_METHODS
+            and not (key is not None and cache.get(key))
+        )
+        try:
+            yield key
+        finally:
+            replica_reads.reset(token)
+
+    def process_response(self, request, response, key):
+        if key is not None and request.method not in SAFE_METHODS:
+            cache.set(key, True, settings.READ_YOUR_WRITES_WINDOW)
+        return response
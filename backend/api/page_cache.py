@@ -0,0 +1,57 @@
+import hashlib
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from .routers import primary_reads
+from .versions import RECIPES_VERSION_KEY, bump_version, get_version
+
+PAGE_CACHE_TIMEOUT = 60 * 10
+
+
+def get_page_cache_key(request, version):
+    query = urlencode(sorted(
+        (param, value)
+        for param, values in request.query_params.lists()
+        for value in values
+    ))
+    key = '\n'.join((version, request.get_host(), request.path, query))
+    return 'recipes-page:' + hashlib.sha1(key.encode()).hexdigest()
+
+
+def invalidate_recipe_pages():
+    bump_version(RECIPES_VERSION_KEY)
+
+
+class AnonymousPageCacheMixin:
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        if (
+            not request.user.is_anonymous
+            or request.accepted_renderer.format != 'json'
+        ):
+            return handler(request, *args, **kwargs)
+        key = get_page_cache_key(request, get_version(RECIPES_VERSION_KEY))
+        content = cache.get(key)
+        if content is None:
+            with primary_reads():
+                response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            content = request.accepted_renderer.render(response.data)
+            cache.set(key, content, PAGE_CACHE_TIMEOUT)
+        return HttpResponse(
+            content,
+            content_type=request.accepted_renderer.media_type
+        )
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
@@ -0,0 +1,137 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import Http404
+from recipes.models import IngredientAmount, Recipe
+from rest_framework.response import Response
+
+from .images import build_rendition_urls
+from .metrics import serializer_timer
+from .serializers import get_followed_ids
+
+AUTHOR_FIELDS = ('email', 'id', 'username', 'first_name', 'last_name')
+RECIPE_FIELDS = (
+    'id', 'name', 'text', 'image', 'renditions_ready', 'cooking_time',
+    'pub_date', 'author_id',
+    *(f'author__{field}' for field in AUTHOR_FIELDS),
+)
+USER_FLAGS = ('is_favorited', 'is_in_shopping_cart')
+
+
+def get_recipe_rows(queryset, user):
+    if user.is_anonymous:
+        return queryset.values(*RECIPE_FIELDS)
+    return queryset.values(*RECIPE_FIELDS, *USER_FLAGS)
+
+
+def get_tags(recipe_ids):
+    tags = defaultdict(list)
+    links = Recipe.tags.through.objects.filter(
+        recipe_id__in=recipe_ids
+    ).order_by('tag_id').values_list(
+        'recipe_id', 'tag_id', 'tag__name', 'tag__color', 'tag__slug'
+    )
+    for recipe_id, tag_id, name, color, slug in links:
+        tags[recipe_id].append({
+            'id': tag_id,
+            'name': name,
+            'color': color,
+            'slug': slug,
+        })
+    return tags
+
+
+def get_ingredients(recipe_ids):
+    ingredients = defaultdict(list)
+    amounts = IngredientAmount.objects.filter(
+        recipe_id__in=recipe_ids
+    ).order_by('id').values_list(
+        'recipe_id', 'id', 'ingredient__name',
+        'ingredient__measurement_unit', 'amount'
+    )
+    for recipe_id, amount_id, name, measurement_unit, amount in amounts:
+        ingredients[recipe_id].append({
+            'id': amount_id,
+            'name': name,
+            'measurement_unit': measurement_unit,
+            'amount': amount,
+        })
+    return ingredients
+
+
+def get_image_url(image_name, request):
+    if not image_name:
+        return None
+    return request.build_absolute_uri(default_storage.url(image_name))
+
+
+def render_recipes(rows, request):
+    recipe_ids = [row['id'] for row in rows]
+    tags = get_tags(recipe_ids)
+    ingredients = get_ingredients(recipe_ids)
+    anonymous = request.user.is_anonymous
+    followed_ids = set() if anonymous else get_followed_ids(request)
+    with serializer_timer():
+        return [
+            {
+                'id': row['id'],
+                'tags': tags[row['id']],
+                'author': {
+                    'email': row['author__email'],
+                    'id': row['author__id'],
+                    'username': row['author__username'],
+                    'first_name': row['author__first_name'],
+                    'last_name': row['author__last_name'],
+                    'is_subscribed': row['author_id'] in followed_ids,
+                },
+                'ingredients': ingredients[row['id']],
+                'is_favorited': not anonymous and row['is_favorited'],
+                'is_in_shopping_cart': (
+                    not anonymous and row['is_in_shopping_cart']
+                ),
+                'image': get_image_url(row['image'], request),
+                'image_renditions': (
+                    build_rendition_urls(row['image'], request)
+                    if row['renditions_ready'] and row['image'] else None
+                ),
+                'name': row['name'],
+                'text': row['text'],
+                'cooking_time': row['cooking_time'],
+            }
+            for row in rows
+        ]
+
+
+class FastRecipeRenderingMixin:
+
+    def use_fast_rendering(self):
+        return (
+            settings.FAST_RECIPE_RENDERING
+            and self.action in ('list', 'retrieve')
+        )
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_fast_rendering():
+            return super().list(request, *args, **kwargs)
+        rows = get_recipe_rows(
+            self.filter_queryset(self.get_queryset()), request.user
+        )
+        page = self.paginate_queryset(rows)
+        if page is None:
+            return Response(render_recipes(list(rows), request))
+        return self.get_paginated_response(render_recipes(page, request))
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.use_fast_rendering():
+            return super().retrieve(request, *args, **kwargs)
+        lookup = self.lookup_url_kwarg or self.lookup_field
+        rows = list(get_recipe_rows(
+            self.filter_queryset(self.get_queryset()).filter(
+                **{self.lookup_field: self.kwargs[lookup]}
+            ),
+            request.user
+        ))
+        if not rows:
+            raise Http404
+        return Response(render_recipes(rows, request)[0])
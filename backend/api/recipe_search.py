@@ -0,0 +1,37 @@
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from recipes.models import RecipeSearchToken
+from recipes.search import get_matches, get_terms, tokenize
+
+NAME_WEIGHT = 3
+TEXT_WEIGHT = 1
+
+
+def get_tokens(name, text):
+    tokens = dict.fromkeys(tokenize(text), TEXT_WEIGHT)
+    for token in tokenize(name):
+        tokens[token] = tokens.get(token, 0) + NAME_WEIGHT
+    return tokens
+
+
+def index_recipes(recipes):
+    recipe_ids = [recipe_id for recipe_id, _, _ in recipes]
+    with transaction.atomic():
+        RecipeSearchToken.objects.filter(recipe_id__in=recipe_ids).delete()
+        RecipeSearchToken.objects.bulk_create(
+            RecipeSearchToken(recipe_id=recipe_id, token=token, weight=weight)
+            for recipe_id, name, text in recipes
+            for token, weight in get_tokens(name, text).items()
+        )
+
+
+def search_recipes(queryset, query):
+    terms = get_terms(query)
+    if not terms:
+        return queryset.none()
+    matches = get_matches(terms)
+    return queryset.filter(
+        pk__in=matches.values('recipe')
+    ).annotate(search_rank=Subquery(
+        matches.filter(recipe=OuterRef('pk')).values('rank')[:1]
+    )).order_by('-search_rank', '-pub_date', '-id')
@@ -1,14 +1,28 @@
+from django.db import transaction
 from djoser.serializers import UserCreateSerializer, UserSerializer
-from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
 
+from .images import RecipeImageField, get_rendition_urls, schedule_renditions
+from .metrics import TimedSerializerMixin
+from .shopping_documents import bump_recipe_carts
+
 from recipes.models import (Favorite, Ingredient, IngredientAmount, Recipe,
                             ShoppingCart, Tag)
 from users.models import Follow, User
 
 
-class CustomUserSerializer(UserSerializer):
+def get_followed_ids(request):
+    if not hasattr(request, 'followed_ids'):
+        request.followed_ids = set(
+            Follow.objects.filter(
+                follower=request.user
+            ).order_by().values_list('following_id', flat=True)
+        )
+    return request.followed_ids
+
+
+class CustomUserSerializer(TimedSerializerMixin, UserSerializer):
 
     is_subscribed = serializers.SerializerMethodField(read_only=True)
 
@@ -23,10 +37,7 @@ class CustomUserSerializer(UserSerializer):
         request = self.context.get('request')
         if request is None or request.user.is_anonymous:
             return False
-        return Follow.objects.filter(
-            follower=obj,
-            following=request.user
-        ).exists()
+        return obj.id in get_followed_ids(request)
 
 
 class CustomUserCreateSerializer(UserCreateSerializer):
@@ -39,14 +50,14 @@ class CustomUserCreateSerializer(UserCreateSerializer):
         model = User
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(TimedSerializerMixin, serializers.ModelSerializer):
 
     class Meta:
         fields = ('id', 'name', 'color', 'slug')
         model = Tag
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedSerializerMixin, serializers.ModelSerializer):
 
     class Meta:
         fields = ('id', 'name', 'measurement_unit')
@@ -77,14 +88,14 @@ INGREDIENTS_AMOUNT = 'Количество ингредиента должно 
 UNIQ_INGREDIENTS = 'Ингредиенты должны быть уникальными!'
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     tags = serializers.PrimaryKeyRelatedField(
         queryset=Tag.objects.all(),
         many=True
     )
     ingredients = IngredientAmountSerializer(many=True)
     author = CustomUserSerializer(read_only=True)
-    image = Base64ImageField()
+    image = RecipeImageField()
 
     class Meta:
         model = Recipe
@@ -141,33 +152,70 @@ class RecipeSerializer(serializers.ModelSerializer):
         )
 
     @staticmethod
-    def create_tags(tags, recipe):
-        for tag in tags:
-            recipe.tags.add(tag)
-
+    def update_ingredients(ingredients, recipe):
+        amounts = {
+            amount.ingredient_id: amount
+            for amount in recipe.ingredientamount_set.all()
+        }
+        new_amounts = []
+        changed_amounts = []
+        for ingredient in ingredients:
+            amount = amounts.pop(ingredient['id'].id, None)
+            if amount is None:
+                new_amounts.append(IngredientAmount(
+                    recipe=recipe,
+                    ingredient=ingredient['id'],
+                    amount=ingredient['amount']
+                ))
+            elif amount.amount != ingredient['amount']:
+                amount.amount = ingredient['amount']
+                changed_amounts.append(amount)
+        if amounts:
+            IngredientAmount.objects.filter(
+                id__in=[amount.id for amount in amounts.values()]
+            ).delete()
+        if changed_amounts:
+            IngredientAmount.objects.bulk_update(changed_amounts, ['amount'])
+        if new_amounts:
+            IngredientAmount.objects.bulk_create(new_amounts)
+        if changed_amounts or new_amounts:
+            bump_recipe_carts([recipe.id])
+
+    @transaction.atomic
     def create(self, validated_data):
         author = self.context.get('request').user
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
         recipe = Recipe.objects.create(author=author, **validated_data)
-        self.create_tags(tags, recipe)
+        recipe.tags.set(tags)
         self.create_ingredients(ingredients, recipe)
+        schedule_renditions(recipe)
         return recipe
 
     def to_representation(self, instance):
         request = self.context.get('request')
         context = {'request': request}
+        instance = Recipe.objects.with_related().with_user_flags(
+            request.user
+        ).get(pk=instance.pk)
         return RecipeListSerializer(instance, context=context).data
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        instance.tags.clear()
-        IngredientAmount.objects.filter(recipe=instance).delete()
-        self.create_tags(validated_data.pop('tags'), instance)
-        self.create_ingredients(validated_data.pop('ingredients'), instance)
-        return super().update(instance, validated_data)
-
-
-class RecipeListSerializer(serializers.ModelSerializer):
+        instance.tags.set(validated_data.pop('tags'))
+        self.update_ingredients(validated_data.pop('ingredients'), instance)
+        old_image_name = instance.image.name
+        if 'image' in validated_data:
+            validated_data['renditions_ready'] = False
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=list(validated_data))
+        if 'image' in validated_data:
+            schedule_renditions(instance, old_image_name)
+        return instance
+
+
+class RecipeListSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     ingredients = IngredientAmountSerializer(
         source='ingredientamount_set',
         many=True,
@@ -176,20 +224,26 @@ class RecipeListSerializer(serializers.ModelSerializer):
     author = CustomUserSerializer()
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
+    image_renditions = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
         fields = (
             'id', 'tags', 'author', 'ingredients', 'is_favorited',
-            'is_in_shopping_cart', 'image', 'name',
+            'is_in_shopping_cart', 'image', 'image_renditions', 'name',
             'image', 'text', 'cooking_time'
         )
         read_only_fields = '__all__',
 
+    def get_image_renditions(self, obj):
+        return get_rendition_urls(obj, self.context.get('request'))
+
     def get_is_favorited(self, obj):
         user = self.context.get('request').user
         if user.is_anonymous:
             return False
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         return Favorite.objects.filter(
             recipe=obj,
             user=user
@@ -199,24 +253,61 @@ class RecipeListSerializer(serializers.ModelSerializer):
         user = self.context.get('request').user
         if user.is_anonymous:
             return False
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         return ShoppingCart.objects.filter(
             recipe=obj,
             user=user
         ).exists()
 
 
-class ShortRecipeSerializer(serializers.ModelSerializer):
+class ShortRecipeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    image_renditions = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_renditions', 'cooking_time')
 
+    def get_image_renditions(self, obj):
+        return get_rendition_urls(obj, self.context.get('request'))
 
-SELF_FOLLOW = 'Нельзя подписаться на самого себя'
-DOUBLE_FOLLOW = 'Подписка уже существует'
 
+RECIPES_BATCH_MAX = 100
 
-class FollowSerializer(serializers.ModelSerializer):
+
+class RecipeIdsSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=RECIPES_BATCH_MAX
+    )
+
+    def validate_recipes(self, value):
+        return list(dict.fromkeys(value))
+
+
+SELF_FOLLOW = 'Нельзя подписаться на самого себя'
+DOUBLE_FOLLOW = 'Подписка уже существует'
+RECIPES_LIMIT = 'recipes_limit должен быть целым неотрицательным числом!'
+RECIPES_LIMIT_MAX = 50
+
+
+def get_recipes_limit(request):
+    if request is None:
+        return RECIPES_LIMIT_MAX
+    limit = request.query_params.get('recipes_limit')
+    if limit is None:
+        return RECIPES_LIMIT_MAX
+    try:
+        limit = int(limit)
+    except ValueError:
+        raise serializers.ValidationError({'recipes_limit': RECIPES_LIMIT})
+    if limit < 0:
+        raise serializers.ValidationError({'recipes_limit': RECIPES_LIMIT})
+    return min(limit, RECIPES_LIMIT_MAX)
+
+
+class FollowSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     id = serializers.ReadOnlyField(source='following.id')
     email = serializers.ReadOnlyField(source='following.email')
     username = serializers.ReadOnlyField(source='following.username')
@@ -247,12 +338,11 @@ class FollowSerializer(serializers.ModelSerializer):
 
     def get_recipes(self, obj):
         request = self.context.get('request')
-        limit_recipes = request.query_params.get('recipes_limit')
-        recipe = Recipe.objects.filter(author=obj.following)
-        if limit_recipes is not None:
-            recipes = recipe.all()[:(int(limit_recipes))]
-        else:
-            recipes = recipe.all()
+        recipes = getattr(obj.following, 'limited_recipes', None)
+        if recipes is None:
+            recipes = Recipe.objects.filter(
+                author=obj.following
+            )[:get_recipes_limit(request)]
         context = {'request': request}
         return ShortRecipeSerializer(
             recipes,
@@ -260,14 +350,10 @@ class FollowSerializer(serializers.ModelSerializer):
             context=context).data
 
     def get_is_subscribed(self, obj):
-        following = obj.following
-        if not following:
+        request = self.context.get('request')
+        if request is None or request.user.is_anonymous:
             return False
-        return Follow.objects.filter(
-            following=obj.follower,
-            follower=following
-        ).exists()
+        return obj.following_id in get_followed_ids(request)
 
-    @staticmethod
-    def get_recipes_count(obj):
-        return Recipe.objects.filter(author=obj.following).count()
+    def get_recipes_count(self, obj):
+        return obj.following.recipes_count
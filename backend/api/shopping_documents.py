@@ -0,0 +1,122 @@
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from recipes.models import ShoppingCart
+
+from .routers import primary_reads
+from .shopping_list import render_shopping_list
+from .versions import CATALOGUE_VERSION_KEY, bump_versions, get_version
+
+CART_VERSION_KEY = 'shopping-cart-version:{user_id}'
+BACKGROUND_FORMATS = ('pdf',)
+ERROR_SUFFIX = '.error'
+
+logger = logging.getLogger(__name__)
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.SHOPPING_LIST_WORKERS,
+    thread_name_prefix='shopping-lists'
+)
+pending = set()
+pending_lock = threading.Lock()
+
+
+def get_cart_version(user_id):
+    return '-'.join((
+        get_version(CART_VERSION_KEY.format(user_id=user_id)),
+        get_version(CATALOGUE_VERSION_KEY),
+    ))
+
+
+def bump_cart_versions(user_ids):
+    keys = {CART_VERSION_KEY.format(user_id=user_id) for user_id in user_ids}
+    if keys:
+        transaction.on_commit(lambda: bump_versions(keys))
+
+
+def bump_recipe_carts(recipe_ids):
+    bump_cart_versions(ShoppingCart.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('user_id', flat=True))
+
+
+def get_document_path(user_id, version, file_format):
+    return os.path.join(
+        settings.SHOPPING_LISTS_ROOT,
+        str(user_id),
+        f'{version}.{file_format}'
+    )
+
+
+def open_document(path):
+    try:
+        return open(path, 'rb')
+    except FileNotFoundError:
+        return None
+
+
+def remove_stale_documents(directory, version):
+    for name in os.listdir(directory):
+        if not name.startswith(('.', version)):
+            with suppress(FileNotFoundError):
+                os.remove(os.path.join(directory, name))
+
+
+def build_document(user_id, version, file_format):
+    path = get_document_path(user_id, version, file_format)
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    with primary_reads(), tempfile.NamedTemporaryFile(
+        dir=directory, prefix='.', delete=False
+    ) as file:
+        try:
+            for chunk in render_shopping_list(user_id, file_format):
+                file.write(chunk.encode() if isinstance(chunk, str) else chunk)
+        except Exception:
+            os.remove(file.name)
+            raise
+    os.replace(file.name, path)
+    remove_stale_documents(directory, version)
+    return path
+
+
+def pop_document_error(user_id, version, file_format):
+    try:
+        os.remove(
+            get_document_path(user_id, version, file_format) + ERROR_SUFFIX
+        )
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def run_build(user_id, version, file_format):
+    close_old_connections()
+    try:
+        build_document(user_id, version, file_format)
+    except Exception:
+        logger.exception(
+            'Не удалось подготовить список покупок пользователя %s', user_id
+        )
+        path = get_document_path(user_id, version, file_format)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        open(path + ERROR_SUFFIX, 'w').close()
+    finally:
+        close_old_connections()
+        with pending_lock:
+            pending.discard((user_id, version, file_format))
+
+
+def schedule_document(user_id, version, file_format):
+    key = (user_id, version, file_format)
+    with pending_lock:
+        if key in pending:
+            return
+        pending.add(key)
+    executor.submit(run_build, *key)
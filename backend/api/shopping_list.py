@@ -0,0 +1,141 @@
+import csv
+import datetime
+import io
+import json
+import logging
+import textwrap
+
+from django.conf import settings
+from django.db.models import Sum
+from PIL import Image, ImageDraw, ImageFont
+from recipes.models import IngredientAmount
+
+FILENAME = 'ShoppingList'
+CONTENT_TYPES = {
+    'txt': 'text/plain; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+    'json': 'application/json',
+    'pdf': 'application/pdf',
+}
+CSV_HEADER = ('name', 'measurement_unit', 'amount')
+PDF_TITLE = 'Список покупок'
+PDF_PAGE_SIZE = (1240, 1754)
+PDF_RESOLUTION = 150
+PDF_MARGIN = 120
+PDF_FONT_SIZE = 28
+PDF_LINE_HEIGHT = 42
+PDF_LINE_WIDTH = 60
+
+logger = logging.getLogger(__name__)
+
+
+def get_ingredients(user):
+    return IngredientAmount.objects.filter(
+        recipe__shopping_carts__user=user
+    ).values(
+        'ingredient__name', 'ingredient__measurement_unit'
+    ).annotate(
+        total_amount=Sum('amount')
+    ).order_by('ingredient__name', 'ingredient__measurement_unit')
+
+
+def render_txt(ingredients):
+    for item in ingredients:
+        yield (f"* {item['ingredient__name']}: {item['total_amount']}"
+               f" {item['ingredient__measurement_unit']};\n")
+    yield (f'\n FoodGram, connecting people (｡◕‿◕｡)'
+           f'\n {datetime.date.today().year}')
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def render_csv(ingredients):
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_HEADER)
+    for item in ingredients:
+        yield writer.writerow((
+            item['ingredient__name'],
+            item['ingredient__measurement_unit'],
+            item['total_amount'],
+        ))
+
+
+def render_json(ingredients):
+    separator = '['
+    for item in ingredients:
+        yield separator + json.dumps({
+            'name': item['ingredient__name'],
+            'measurement_unit': item['ingredient__measurement_unit'],
+            'amount': item['total_amount'],
+        }, ensure_ascii=False)
+        separator = ','
+    yield '[]' if separator == '[' else ']'
+
+
+def get_pdf_lines(ingredients):
+    yield PDF_TITLE
+    yield ''
+    for item in ingredients:
+        yield from textwrap.wrap(
+            f"• {item['ingredient__name']} — {item['total_amount']}"
+            f" {item['ingredient__measurement_unit']}",
+            PDF_LINE_WIDTH,
+            subsequent_indent='  '
+        )
+    yield ''
+    yield f'FoodGram, {datetime.date.today().year}'
+
+
+def load_pdf_font():
+    try:
+        return ImageFont.truetype(settings.SHOPPING_LIST_FONT, PDF_FONT_SIZE)
+    except OSError:
+        logger.warning(
+            'Шрифт %s не найден, выгрузка списка покупок в pdf отключена',
+            settings.SHOPPING_LIST_FONT
+        )
+        return None
+
+
+pdf_font = load_pdf_font()
+
+
+def render_pdf(ingredients):
+    lines_per_page = (PDF_PAGE_SIZE[1] - 2 * PDF_MARGIN) // PDF_LINE_HEIGHT
+    pages = []
+    for number, line in enumerate(get_pdf_lines(ingredients)):
+        row = number % lines_per_page
+        if row == 0:
+            pages.append(Image.new('1', PDF_PAGE_SIZE, 1))
+            draw = ImageDraw.Draw(pages[-1])
+        draw.text(
+            (PDF_MARGIN, PDF_MARGIN + row * PDF_LINE_HEIGHT),
+            line,
+            font=pdf_font,
+            fill=0
+        )
+    buffer = io.BytesIO()
+    pages[0].save(
+        buffer,
+        'PDF',
+        save_all=True,
+        append_images=pages[1:],
+        resolution=PDF_RESOLUTION
+    )
+    yield buffer.getvalue()
+
+
+RENDERERS = {
+    'txt': render_txt,
+    'csv': render_csv,
+    'json': render_json,
+}
+if pdf_font is not None:
+    RENDERERS['pdf'] = render_pdf
+
+
+def render_shopping_list(user, file_format):
+    return RENDERERS[file_format](get_ingredients(user).iterator())
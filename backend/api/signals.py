@@ -0,0 +1,101 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from recipes.models import (Favorite, Ingredient, IngredientAmount, Recipe,
+                            ShoppingCart, Tag)
+from rest_framework.authtoken.models import Token
+from users.models import Follow, User
+
+from .authentication import forget_user
+from .counters import LIST_COUNTERS, change_counter
+from .page_cache import invalidate_recipe_pages
+from .recipe_search import index_recipes
+from .shopping_documents import bump_cart_versions, bump_recipe_carts
+from .versions import CATALOGUE_VERSION_KEY, bump_version
+
+INDEXED_FIELDS = {'name', 'text'}
+CARD_USER_FIELDS = {'email', 'username', 'first_name', 'last_name'}
+
+
+@receiver([post_save, post_delete], sender=Tag)
+@receiver([post_save, post_delete], sender=Ingredient)
+def bump_catalogue(**kwargs):
+    transaction.on_commit(lambda: bump_version(CATALOGUE_VERSION_KEY))
+
+
+@receiver([post_save, post_delete], sender=Recipe)
+@receiver([post_save, post_delete], sender=IngredientAmount)
+@receiver([post_save, post_delete], sender=Tag)
+@receiver(post_delete, sender=User)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipes(**kwargs):
+    invalidate_recipe_pages()
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_recipes(update_fields, **kwargs):
+    if update_fields is None or CARD_USER_FIELDS.intersection(update_fields):
+        invalidate_recipe_pages()
+
+
+@receiver(post_save, sender=Recipe)
+def count_created_recipe(instance, created, **kwargs):
+    if created:
+        change_counter(User, [instance.author_id], 'recipes_count', 1)
+
+
+@receiver(post_save, sender=Recipe)
+def index_saved_recipe(instance, update_fields, **kwargs):
+    if update_fields is None or INDEXED_FIELDS.intersection(update_fields):
+        index_recipes([(instance.id, instance.name, instance.text)])
+
+
+@receiver(post_delete, sender=Recipe)
+def count_deleted_recipe(instance, **kwargs):
+    change_counter(User, [instance.author_id], 'recipes_count', -1)
+
+
+@receiver([post_save, post_delete], sender=ShoppingCart)
+def bump_shopping_cart(instance, **kwargs):
+    bump_cart_versions([instance.user_id])
+
+
+@receiver([post_save, post_delete], sender=IngredientAmount)
+def bump_ingredient_carts(instance, **kwargs):
+    bump_recipe_carts([instance.recipe_id])
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def count_created_list_item(sender, instance, created, **kwargs):
+    if created:
+        change_counter(
+            Recipe, [instance.recipe_id], LIST_COUNTERS[sender], 1
+        )
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def count_deleted_list_item(sender, instance, **kwargs):
+    change_counter(Recipe, [instance.recipe_id], LIST_COUNTERS[sender], -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_created_follow(instance, created, **kwargs):
+    if created:
+        change_counter(User, [instance.following_id], 'followers_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(instance, **kwargs):
+    change_counter(User, [instance.following_id], 'followers_count', -1)
+
+
+@receiver(post_delete, sender=Token)
+def forget_token(instance, **kwargs):
+    forget_user(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=User)
+def forget_user_tokens(instance, **kwargs):
+    forget_user(instance.pk)
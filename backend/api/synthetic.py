@@ -0,0 +1,192 @@
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from recipes.models import (Favorite, Ingredient, IngredientAmount, Recipe,
+                            ShoppingCart, Tag)
+from users.models import Follow, User
+
+from .recipe_search import index_recipes
+
+SYNTHETIC_PASSWORD = 'synthetic-password'
+SYNTHETIC_IMAGE = 'recipes/images/synthetic.png'
+MEASUREMENT_UNITS = ('г', 'кг', 'мл', 'шт', 'ст. л.', 'по вкусу')
+CHUNK_SIZE = 5000
+SKEW = 2.5
+
+
+def create_ingredients(count, seed=0):
+    rng = random.Random(seed)
+    Ingredient.objects.bulk_create((
+        Ingredient(
+            name=f'ингредиент {index}',
+            measurement_unit=rng.choice(MEASUREMENT_UNITS)
+        ) for index in range(count)
+    ), ignore_conflicts=True)
+
+
+class SyntheticDataGenerator:
+
+    def __init__(self, seed=0, skew=SKEW, chunk_size=CHUNK_SIZE,
+                 progress=None):
+        self.rng = random.Random(seed)
+        self.skew = skew
+        self.chunk_size = chunk_size
+        self.progress = progress or (lambda message: None)
+
+    def skewed(self, size):
+        return int(size * self.rng.random() ** self.skew)
+
+    def sample(self, size, count, exclude=None):
+        if count >= size:
+            return [index for index in range(size) if index != exclude]
+        if count * 2 > size:
+            return [
+                index for index in self.rng.sample(range(size), count)
+                if index != exclude
+            ]
+        chosen = set()
+        while len(chosen) < count:
+            index = self.skewed(size)
+            if index != exclude:
+                chosen.add(index)
+        return list(chosen)
+
+    def chunks(self, total, rows_per_item=1):
+        size = max(1, self.chunk_size // max(1, rows_per_item))
+        for start in range(0, total, size):
+            yield start, min(start + size, total)
+
+    @staticmethod
+    def next_id(model):
+        return (model.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+
+    @staticmethod
+    def per_user(total, users, index):
+        return total // users + (1 if index < total % users else 0)
+
+    def create_users(self, count):
+        first_id = self.next_id(User)
+        password = make_password(SYNTHETIC_PASSWORD)
+        for start, stop in self.chunks(count):
+            with transaction.atomic():
+                User.objects.bulk_create(
+                    User(
+                        id=first_id + index,
+                        username=f'seed{first_id + index}',
+                        email=f'seed{first_id + index}@example.com',
+                        first_name=f'Имя{index}',
+                        last_name=f'Фамилия{index}',
+                        password=password,
+                    ) for index in range(start, stop)
+                )
+            self.progress(f'Пользователи: {stop}/{count}')
+        return first_id
+
+    def create_tags(self, count):
+        existing = Tag.objects.count()
+        Tag.objects.bulk_create(
+            Tag(
+                name=f'Тэг {index}',
+                slug=f'tag{index}',
+                color=f'#{index:06X}'
+            ) for index in range(existing, count)
+        )
+        return list(Tag.objects.values_list('id', flat=True))
+
+    def create_recipes(self, count, first_user_id, users, tag_ids,
+                       ingredient_ids, amounts):
+        first_id = self.next_id(Recipe)
+        tags_through = Recipe.tags.through
+        for start, stop in self.chunks(count, amounts):
+            recipe_ids = range(first_id + start, first_id + stop)
+            recipes = [
+                Recipe(
+                    id=recipe_id,
+                    author_id=first_user_id + self.skewed(users),
+                    name=f'Рецепт {recipe_id}',
+                    text=f'Описание рецепта {recipe_id}',
+                    image=SYNTHETIC_IMAGE,
+                    cooking_time=self.rng.randint(1, 180),
+                ) for recipe_id in recipe_ids
+            ]
+            with transaction.atomic():
+                Recipe.objects.bulk_create(recipes)
+                index_recipes([
+                    (recipe.id, recipe.name, recipe.text)
+                    for recipe in recipes
+                ])
+                tags_through.objects.bulk_create(
+                    tags_through(recipe_id=recipe_id, tag_id=tag_id)
+                    for recipe_id in recipe_ids
+                    for tag_id in self.rng.sample(
+                        tag_ids, self.rng.randint(1, min(3, len(tag_ids)))
+                    )
+                )
+                IngredientAmount.objects.bulk_create(
+                    IngredientAmount(
+                        recipe_id=recipe_id,
+                        ingredient_id=ingredient_ids[index],
+                        amount=self.rng.randint(1, 500)
+                    )
+                    for recipe_id in recipe_ids
+                    for index in self.sample(len(ingredient_ids), amounts)
+                )
+            self.progress(f'Рецепты: {stop}/{count}')
+        return first_id
+
+    def create_follows(self, total, first_user_id, users):
+        for start, stop in self.chunks(users, total // users):
+            with transaction.atomic():
+                Follow.objects.bulk_create(
+                    Follow(
+                        follower_id=first_user_id + index,
+                        following_id=first_user_id + following
+                    )
+                    for index in range(start, stop)
+                    for following in self.sample(
+                        users, self.per_user(total, users, index), index
+                    )
+                )
+            self.progress(f'Подписки: {stop}/{users}')
+
+    def create_marks(self, model, total, first_user_id, users,
+                     first_recipe_id, recipes):
+        for start, stop in self.chunks(users, total // users):
+            with transaction.atomic():
+                model.objects.bulk_create(
+                    model(
+                        user_id=first_user_id + index,
+                        recipe_id=first_recipe_id + recipe
+                    )
+                    for index in range(start, stop)
+                    for recipe in self.sample(
+                        recipes, self.per_user(total, users, index)
+                    )
+                )
+            self.progress(
+                f'{model._meta.verbose_name}: {stop}/{users}'
+            )
+
+    def generate(self, users, recipes, tags, amounts, follows, favorites,
+                 carts):
+        ingredient_ids = list(
+            Ingredient.objects.order_by('id').values_list('id', flat=True)
+        )
+        first_user_id = self.create_users(users)
+        tag_ids = self.create_tags(tags)
+        first_recipe_id = self.create_recipes(
+            recipes, first_user_id, users, tag_ids, ingredient_ids, amounts
+        )
+        self.create_follows(follows, first_user_id, users)
+        self.create_marks(Favorite, favorites, first_user_id, users,
+                          first_recipe_id, recipes)
+        self.create_marks(ShoppingCart, carts, first_user_id, users,
+                          first_recipe_id, recipes)
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                no_style(), [User, Recipe]
+            ):
+                cursor.execute(sql)
@@ -0,0 +1,826 @@
+import tempfile
+from base64 import b64encode
+from concurrent.futures import Executor, Future
+from io import StringIO
+from unittest import mock, skipUnless
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.checks.urls import check_url_namespaces_unique
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeSearchToken,
+                            ShoppingCart, Tag)
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from users.models import Follow, User
+
+from . import async_views, images, shopping_documents
+from .authentication import CachedTokenAuthentication, token_cache
+from .counters import COUNTERS, count_subquery
+from .ingredient_index import IngredientIndex
+from .shopping_list import RENDERERS
+from .synthetic import (SYNTHETIC_IMAGE, SyntheticDataGenerator,
+                        create_ingredients)
+from .versions import (CATALOGUE_VERSION_KEY, RECIPES_VERSION_KEY,
+                       bump_version, get_version)
+
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'api-tests',
+    },
+    'versions': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'api-tests-versions',
+    },
+}
+RECIPE_LIST_QUERIES = {'anonymous': 4, 'authenticated': 6}
+RECIPE_DETAIL_QUERIES = {'anonymous': 3, 'authenticated': 5}
+PASSWORD = 'foodgram-pass'
+PNG_IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAA'
+    'DUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=='
+)
+BATCH_QUERIES = {'post': 7, 'delete': 6}
+REPEATED_BATCH_QUERIES = {'post': 5, 'delete': 4}
+SUBSCRIPTIONS_QUERIES = {'page': 5, 'cursor': 4}
+
+
+@override_settings(CACHES=TEST_CACHES)
+class RecipeDataTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        create_ingredients(40)
+        SyntheticDataGenerator(seed=1).generate(
+            users=10, recipes=60, tags=3, amounts=5, follows=30,
+            favorites=100, carts=50
+        )
+        cls.user = User.objects.order_by('id').first()
+        cls.token = Token.objects.create(user=cls.user)
+        cls.recipe = Recipe.objects.order_by('id').first()
+        cls.tags = list(Tag.objects.order_by('id'))
+
+    def setUp(self):
+        cache.clear()
+        token_cache.invalidate(self.token.key)
+        self.clients = {
+            'anonymous': APIClient(),
+            'authenticated': APIClient(
+                HTTP_AUTHORIZATION=f'Token {self.token.key}'
+            ),
+        }
+
+
+class RecipeQueryBudgetTests(RecipeDataTestCase):
+
+    def assert_budget(self, url, budget):
+        for fast in (True, False):
+            for mode, client in self.clients.items():
+                with self.subTest(url=url, mode=mode, fast=fast):
+                    cache.clear()
+                    token_cache.invalidate(self.token.key)
+                    with override_settings(FAST_RECIPE_RENDERING=fast):
+                        with self.assertNumQueries(budget[mode]):
+                            response = client.get(url)
+                    self.assertEqual(response.status_code, 200)
+
+    def test_recipe_list_query_count_does_not_grow_with_page_size(self):
+        for limit in (6, 50):
+            self.assert_budget(
+                f'/api/recipes/?limit={limit}', RECIPE_LIST_QUERIES
+            )
+
+    def test_recipe_detail_query_count(self):
+        self.assert_budget(
+            f'/api/recipes/{self.recipe.id}/', RECIPE_DETAIL_QUERIES
+        )
+
+
+class FastRecipeRenderingParityTests(RecipeDataTestCase):
+
+    def get(self, client, url, fast):
+        cache.clear()
+        with override_settings(FAST_RECIPE_RENDERING=fast):
+            return client.get(url)
+
+    def assert_parity(self, url):
+        for mode, client in self.clients.items():
+            with self.subTest(url=url, mode=mode):
+                fast = self.get(client, url, True)
+                slow = self.get(client, url, False)
+                self.assertEqual(fast.status_code, slow.status_code)
+                self.assertEqual(fast.content, slow.content)
+
+    def get_cursor_url(self, query=''):
+        response = self.get(
+            self.clients['anonymous'],
+            f'/api/recipes/?cursor=&{query}',
+            False
+        )
+        return response.json()['next']
+
+    def test_list_parity(self):
+        tag = self.tags[0]
+        for query in (
+            '',
+            'limit=50',
+            'page=2&limit=7',
+            'page=100',
+            f'author={self.recipe.author_id}',
+            f'tags={tag.slug}',
+            f'tags={tag.slug}&tags=missing&tags_mode=all',
+            'is_favorited=1',
+            'is_in_shopping_cart=1&limit=50',
+            f'search={self.recipe.name.split()[0]}',
+        ):
+            self.assert_parity(f'/api/recipes/?{query}')
+
+    def test_cursor_pagination_parity(self):
+        self.assert_parity('/api/recipes/?cursor=&limit=10')
+        self.assert_parity(self.get_cursor_url('limit=10'))
+
+    def test_detail_parity(self):
+        recipe = Recipe.objects.exclude(tags=self.tags[0]).first()
+        for url in (
+            f'/api/recipes/{recipe.id}/',
+            f'/api/recipes/{recipe.id}/?tags={self.tags[0].slug}',
+            f'/api/recipes/{recipe.id}/?is_favorited=1',
+            '/api/recipes/0/',
+        ):
+            self.assert_parity(url)
+
+
+class CursorPaginationTests(RecipeDataTestCase):
+
+    def setUp(self):
+        super().setUp()
+        Recipe.objects.update(pub_date=timezone.now())
+        self.client = self.clients['authenticated']
+
+    def walk(self, url, link='next'):
+        ids = []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(any(
+                'OFFSET' in query['sql'] for query in queries.captured_queries
+            ))
+            page = response.json()
+            ids.extend(self.get_ids(page['results']))
+            url = page[link]
+        return ids
+
+    def get_ids(self, results):
+        return [item.get('id') or item['email'] for item in results]
+
+    def get_page_ids(self, url):
+        return self.get_ids(self.client.get(url).json()['results'])
+
+    def get_last_url(self, url):
+        while True:
+            next_url = self.client.get(url).json()['next']
+            if next_url is None:
+                return url
+            url = next_url
+
+    def test_recipe_cursor_seeks_past_equal_pub_dates(self):
+        expected = self.get_page_ids('/api/recipes/?limit=100')
+        self.assertEqual(expected, sorted(expected, reverse=True))
+        self.assertEqual(self.walk('/api/recipes/?cursor=&limit=7'), expected)
+        last = self.get_last_url('/api/recipes/?cursor=&limit=7')
+        previous = self.walk(last, 'previous')
+        self.assertEqual(sorted(previous), sorted(expected))
+
+    def test_subscription_modes_share_ordering(self):
+        url = '/api/users/subscriptions/?limit=1'
+        expected = self.get_page_ids(f'{url}&limit=100')
+        self.assertGreater(len(expected), 1)
+        self.assertEqual(self.walk(f'{url}&cursor='), expected)
+
+    def test_malformed_cursor_position_is_not_found(self):
+        for position in ('[', '["x", "1"]', '["1"]', '{}'):
+            cursor = b64encode(f'p={position}'.encode()).decode()
+            with self.subTest(position=position):
+                response = self.client.get(f'/api/recipes/?cursor={cursor}')
+                self.assertEqual(response.status_code, 404)
+
+
+class ShoppingListDocumentTests(RecipeDataTestCase):
+    url = '/api/recipes/download_shopping_cart/'
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        root = override_settings(SHOPPING_LISTS_ROOT=directory.name)
+        root.enable()
+        self.addCleanup(root.disable)
+        for patcher in (
+            mock.patch.object(
+                shopping_documents.executor, 'submit',
+                side_effect=lambda function, *args: function(*args)
+            ),
+            mock.patch.object(shopping_documents, 'close_old_connections'),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client = self.clients['authenticated']
+
+    def download(self, query=''):
+        return self.client.get(self.url + query)
+
+    def test_repeat_download_is_served_from_disk(self):
+        first = self.download()
+        self.assertEqual(first.status_code, 200)
+        with self.assertNumQueries(0):
+            second = self.download()
+        self.assertEqual(second.getvalue(), first.getvalue())
+
+    def test_cart_change_produces_new_document(self):
+        first = self.download()
+        recipe = Recipe.objects.exclude(shopping_carts__user=self.user).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+        self.assertNotEqual(self.download().getvalue(), first.getvalue())
+
+    @skipUnless('pdf' in RENDERERS, 'шрифт для pdf не установлен')
+    def test_pdf_is_prepared_in_background(self):
+        pending = self.download('?format=pdf')
+        self.assertEqual(pending.status_code, 202)
+        self.assertEqual(pending['Location'], pending.json()['url'])
+        document = self.download('?format=pdf')
+        self.assertEqual(document.status_code, 200)
+        self.assertTrue(document.getvalue().startswith(b'%PDF'))
+
+    @skipUnless('pdf' in RENDERERS, 'шрифт для pdf не установлен')
+    def test_failed_pdf_returns_error_once(self):
+        with mock.patch.object(
+            shopping_documents, 'render_shopping_list',
+            side_effect=ValueError
+        ), self.assertLogs('api.shopping_documents', 'ERROR'):
+            self.assertEqual(self.download('?format=pdf').status_code, 202)
+        self.assertEqual(self.download('?format=pdf').status_code, 500)
+        self.assertEqual(self.download('?format=pdf').status_code, 202)
+
+
+class RecipeImageRenditionTests(RecipeDataTestCase):
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        root = override_settings(MEDIA_ROOT=directory.name)
+        root.enable()
+        self.addCleanup(root.disable)
+        for patcher in (
+            mock.patch.object(
+                images.executor, 'submit',
+                side_effect=lambda function, *args: function(*args)
+            ),
+            mock.patch.object(images, 'close_old_connections'),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client = self.clients['authenticated']
+
+    def send(self, method, url):
+        data = {
+            'ingredients': [
+                {'id': ingredient, 'amount': 10}
+                for ingredient in Ingredient.objects.values_list(
+                    'id', flat=True
+                )[:2]
+            ],
+            'tags': [self.tags[0].id],
+            'image': PNG_IMAGE,
+            'name': 'Рецепт с картинкой',
+            'text': 'Описание',
+            'cooking_time': 10,
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            response = getattr(self.client, method)(url, data, format='json')
+        self.assertIn(response.status_code, (200, 201))
+        return Recipe.objects.get(pk=response.json()['id'])
+
+    def get_rendition_names(self, image_name):
+        return [
+            images.get_rendition_name(image_name, rendition, file_format)
+            for rendition in images.RENDITIONS
+            for file_format in images.FORMATS
+        ]
+
+    def test_replaced_image_renditions_are_deleted(self):
+        recipe = self.send('post', '/api/recipes/')
+        old_names = self.get_rendition_names(recipe.image.name)
+        self.assertTrue(recipe.renditions_ready)
+        self.assertTrue(all(map(default_storage.exists, old_names)))
+        updated = self.send('patch', f'/api/recipes/{recipe.id}/')
+        self.assertNotEqual(updated.image.name, recipe.image.name)
+        self.assertTrue(updated.renditions_ready)
+        self.assertFalse(any(map(default_storage.exists, old_names)))
+        self.assertTrue(all(map(
+            default_storage.exists,
+            self.get_rendition_names(updated.image.name)
+        )))
+
+
+class RecipePageInvalidationTests(RecipeDataTestCase):
+
+    def test_login_keeps_recipe_pages(self):
+        self.user.set_password(PASSWORD)
+        self.user.save()
+        version = get_version(RECIPES_VERSION_KEY)
+        response = APIClient().post('/api/auth/token/login/', {
+            'email': self.user.email,
+            'password': PASSWORD,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(get_version(RECIPES_VERSION_KEY), version)
+
+    def test_author_rename_invalidates_recipe_pages(self):
+        version = get_version(RECIPES_VERSION_KEY)
+        self.user.first_name = 'Новое имя'
+        self.user.save(update_fields=['first_name'])
+        self.assertNotEqual(get_version(RECIPES_VERSION_KEY), version)
+
+
+class TokenCacheTests(RecipeDataTestCase):
+    url = '/api/users/me/'
+
+    def setUp(self):
+        super().setUp()
+        self.user.set_password(PASSWORD)
+        self.user.save()
+        self.client = self.clients['authenticated']
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.cached = token_cache.get(self.token.key)
+
+    def keep_entry_in_other_worker(self):
+        token_cache.set(self.token.key, self.cached)
+
+    def test_logout_rejects_cached_token(self):
+        response = self.client.post('/api/auth/token/logout/')
+        self.assertEqual(response.status_code, 204)
+        self.keep_entry_in_other_worker()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_password_change_reloads_cached_token(self):
+        response = self.client.post('/api/users/set_password/', {
+            'current_password': PASSWORD,
+            'new_password': 'foodgram-new-pass',
+        })
+        self.assertEqual(response.status_code, 204)
+        self.keep_entry_in_other_worker()
+        with self.assertNumQueries(1):
+            CachedTokenAuthentication().get_user_values(self.token.key)
+
+    def test_deactivation_rejects_cached_token(self):
+        self.user.is_active = False
+        self.user.save()
+        self.keep_entry_in_other_worker()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+
+class IngredientIndexTests(RecipeDataTestCase):
+
+    def test_index_follows_catalogue_version(self):
+        index = IngredientIndex()
+        self.assertEqual(index.search('новый'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            ingredient = Ingredient.objects.create(
+                name='Новый ингредиент', measurement_unit='г'
+            )
+        self.assertEqual(index.search('новый'), [{
+            'id': ingredient.id,
+            'name': 'Новый ингредиент',
+            'measurement_unit': 'г',
+        }])
+
+    def test_snapshot_is_reused_within_version(self):
+        index = IngredientIndex()
+        index.search('ингредиент')
+        with self.assertNumQueries(0):
+            index.search('ингредиент 1')
+
+
+class CatalogueETagTests(RecipeDataTestCase):
+
+    def get(self, url, etag=None):
+        headers = {} if etag is None else {'HTTP_IF_NONE_MATCH': etag}
+        return self.clients['anonymous'].get(url, **headers)
+
+    def test_unchanged_catalogue_returns_not_modified(self):
+        for url in ('/api/tags/', '/api/ingredients/',
+                    '/api/ingredients/?name=ингр'):
+            with self.subTest(url=url):
+                etag = self.get(url)['ETag']
+                with self.assertNumQueries(0):
+                    response = self.get(url, etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], etag)
+
+    def test_catalogue_change_returns_new_body(self):
+        url = '/api/ingredients/?name=новый'
+        first = self.get(url)
+        self.assertEqual(first.json(), [])
+        Ingredient.objects.bulk_create([
+            Ingredient(name='Новый ингредиент', measurement_unit='г')
+        ])
+        bump_version(CATALOGUE_VERSION_KEY)
+        response = self.get(url, first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+        self.assertEqual(
+            [item['name'] for item in response.json()],
+            ['Новый ингредиент']
+        )
+
+    def test_tag_change_returns_new_etag(self):
+        first = self.get('/api/tags/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tags[0].name = 'Другой'
+            self.tags[0].save()
+        response = self.get('/api/tags/', first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Другой', response.content.decode())
+
+
+class InlineExecutor(Executor):
+
+    def submit(self, function, *args, **kwargs):
+        future = Future()
+        future.set_result(function(*args, **kwargs))
+        return future
+
+
+async def run_in_test_thread(function, *args, **kwargs):
+    return await sync_to_async(function)(*args, **kwargs)
+
+
+class AsyncRoutesTests(RecipeDataTestCase):
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        root = override_settings(SHOPPING_LISTS_ROOT=directory.name)
+        root.enable()
+        self.addCleanup(root.disable)
+        for patcher in (
+            mock.patch.object(async_views, 'run_in_pool', run_in_test_thread),
+            mock.patch.object(
+                async_views, 'fan_out_executor', InlineExecutor()
+            ),
+            mock.patch.object(async_views, 'close_old_connections'),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client = self.clients['authenticated']
+
+    def get(self, url, urlconf):
+        cache.clear()
+        with override_settings(ROOT_URLCONF=urlconf):
+            return self.client.get(url)
+
+    def test_api_namespace_is_unique(self):
+        with override_settings(ROOT_URLCONF='foodgram.asgi_urls'):
+            self.assertEqual(check_url_namespaces_unique(None), [])
+
+    def test_async_routes_match_sync_routes(self):
+        for url in (
+            '/api/users/subscriptions/',
+            '/api/users/subscriptions/?recipes_limit=1&limit=3&page=2',
+            '/api/users/subscriptions/?recipes_limit=x',
+            '/api/recipes/?limit=6',
+            '/api/ingredients/?name=ингр',
+        ):
+            with self.subTest(url=url):
+                sync = self.get(url, 'foodgram.urls')
+                response = self.get(url, 'foodgram.asgi_urls')
+                self.assertEqual(response.status_code, sync.status_code)
+                self.assertEqual(response.content, sync.content)
+
+    def test_shopping_list_is_streamed(self):
+        url = '/api/recipes/download_shopping_cart/'
+        sync = self.get(url, 'foodgram.urls')
+        response = self.get(url, 'foodgram.asgi_urls')
+        self.assertTrue(response.streaming)
+        self.assertEqual(response.getvalue(), sync.getvalue())
+
+
+class RecipeListBatchTests(RecipeDataTestCase):
+    lists = (
+        (Favorite, 'favorites_count', '/api/recipes/favorite/'),
+        (ShoppingCart, 'in_carts_count', '/api/recipes/shopping_cart/'),
+    )
+
+    def setUp(self):
+        super().setUp()
+        self.client = self.clients['authenticated']
+        CachedTokenAuthentication().get_user_values(self.token.key)
+        self.ids = list(Recipe.objects.exclude(
+            favorites__user=self.user
+        ).exclude(shopping_carts__user=self.user).values_list(
+            'id', flat=True
+        )[:10])
+
+    def get_counters(self, counter):
+        return dict(Recipe.objects.filter(id__in=self.ids).values_list(
+            'id', counter
+        ))
+
+    def send(self, method, url, budget=BATCH_QUERIES):
+        with self.assertNumQueries(budget[method]):
+            return getattr(self.client, method)(
+                url, {'recipes': self.ids}, format='json'
+            )
+
+    def test_batch_add_and_remove(self):
+        for model, counter, url in self.lists:
+            with self.subTest(model=model.__name__):
+                before = self.get_counters(counter)
+                response = self.send('post', url)
+                self.assertEqual(response.status_code, 201)
+                self.assertEqual(self.get_counters(counter), {
+                    pk: value + 1 for pk, value in before.items()
+                })
+                self.assertEqual(model.objects.filter(
+                    user=self.user, recipe_id__in=self.ids
+                ).count(), len(self.ids))
+                with self.captureOnCommitCallbacks() as callbacks:
+                    response = self.send('delete', url)
+                self.assertEqual(response.status_code, 204)
+                self.assertEqual(len(callbacks), int(model is ShoppingCart))
+                self.assertEqual(self.get_counters(counter), before)
+                self.assertFalse(model.objects.filter(
+                    user=self.user, recipe_id__in=self.ids
+                ).exists())
+
+    def test_repeated_batches_are_idempotent(self):
+        for model, counter, url in self.lists:
+            with self.subTest(model=model.__name__):
+                before = self.get_counters(counter)
+                self.send('post', url)
+                added = self.get_counters(counter)
+                response = self.send('post', url, REPEATED_BATCH_QUERIES)
+                self.assertEqual(response.status_code, 201)
+                self.assertEqual(self.get_counters(counter), added)
+                self.send('delete', url)
+                response = self.send('delete', url, REPEATED_BATCH_QUERIES)
+                self.assertEqual(response.status_code, 204)
+                self.assertEqual(self.get_counters(counter), before)
+
+
+class CounterTests(RecipeDataTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.reconcile()
+        self.client = self.clients['authenticated']
+
+    @staticmethod
+    def reconcile():
+        call_command('reconcile_counters', stdout=StringIO())
+
+    def assert_counters_match(self):
+        for model, counter, source, field in COUNTERS:
+            with self.subTest(counter=counter):
+                self.assertFalse(model.objects.exclude(
+                    **{counter: count_subquery(source, field)}
+                ).exists())
+
+    def test_api_list_and_follow_changes(self):
+        recipe = Recipe.objects.exclude(favorites__user=self.user).exclude(
+            shopping_carts__user=self.user
+        ).first()
+        author = User.objects.exclude(pk=self.user.pk).exclude(
+            following__follower=self.user
+        ).first()
+        for url in (
+            f'/api/recipes/{recipe.id}/favorite/',
+            f'/api/recipes/{recipe.id}/shopping_cart/',
+            f'/api/users/{author.id}/subscribe/',
+        ):
+            with self.subTest(url=url):
+                self.client.post(url)
+                self.assert_counters_match()
+                self.client.delete(url)
+                self.assert_counters_match()
+
+    def test_recipe_create_and_delete(self):
+        recipe = Recipe.objects.create(
+            author=self.user, name='Рецепт', text='Описание',
+            cooking_time=5, image=SYNTHETIC_IMAGE
+        )
+        self.assert_counters_match()
+        recipe.delete()
+        self.assert_counters_match()
+
+    def test_cascade_deletes(self):
+        favorited = Favorite.objects.values('recipe')
+        Recipe.objects.filter(pk__in=favorited[:5]).delete()
+        self.assert_counters_match()
+        user = User.objects.filter(
+            favorites__isnull=False, shopping_carts__isnull=False,
+            follower__isnull=False, recipe__isnull=False
+        ).first()
+        user.delete()
+        self.assert_counters_match()
+
+    def test_admin_queryset_deletes(self):
+        for model in (Favorite, ShoppingCart, Follow):
+            with self.subTest(model=model.__name__):
+                model.objects.filter(
+                    pk__in=model.objects.values('pk')[:10]
+                ).delete()
+                self.assert_counters_match()
+
+    def test_reconcile_repairs_drift(self):
+        Recipe.objects.update(favorites_count=0, in_carts_count=7)
+        User.objects.update(recipes_count=3, followers_count=0)
+        self.reconcile()
+        self.assert_counters_match()
+
+
+class RecipeTagFilterTests(RecipeDataTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.recipe_tags = {recipe_id: set() for recipe_id in (
+            Recipe.objects.values_list('id', flat=True)
+        )}
+        for recipe_id, slug in Recipe.tags.through.objects.values_list(
+            'recipe_id', 'tag__slug'
+        ):
+            self.recipe_tags[recipe_id].add(slug)
+
+    def get_ids(self, query):
+        response = self.clients['anonymous'].get(
+            f'/api/recipes/?limit=200&{query}'
+        )
+        self.assertEqual(response.status_code, 200)
+        ids = [recipe['id'] for recipe in response.json()['results']]
+        self.assertEqual(len(ids), len(set(ids)))
+        return set(ids)
+
+    def expect(self, slugs, match):
+        return {
+            recipe_id for recipe_id, tags in self.recipe_tags.items()
+            if match(slug in tags for slug in slugs)
+        }
+
+    def test_tags_modes(self):
+        first, second = (tag.slug for tag in self.tags[:2])
+        tagged = self.expect([first], any)
+        either = self.expect([first, second], any)
+        both = self.expect([first, second], all)
+        self.assertTrue(0 < len(both) < len(tagged) < len(either))
+        for query, expected in (
+            (f'tags={first}', tagged),
+            (f'tags={first}&tags={second}', either),
+            (f'tags={first}&tags={second}&tags_mode=any', either),
+            (f'tags={first}&tags={second}&tags_mode=all', both),
+            (f'tags={first}&tags={first}&tags_mode=all', tagged),
+            (f'tags={first}&tags=missing', tagged),
+            (f'tags={first}&tags=missing&tags_mode=all', set()),
+        ):
+            with self.subTest(query=query):
+                self.assertEqual(self.get_ids(query), expected)
+
+    def test_empty_tags_do_not_filter(self):
+        for query in ('tags=', 'tags=&tags_mode=all', 'tags_mode=all'):
+            with self.subTest(query=query):
+                self.assertEqual(self.get_ids(query), set(self.recipe_tags))
+
+    def test_unknown_tags_mode_is_rejected(self):
+        response = self.clients['anonymous'].get(
+            f'/api/recipes/?tags={self.tags[0].slug}&tags_mode=some'
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class RecipeSearchTests(RecipeDataTestCase):
+
+    def setUp(self):
+        super().setUp()
+        for name in ('Ёлочный пирог', 'Елочка из теста', 'Ель'):
+            Recipe.objects.create(
+                author=self.user, name=name, text='Праздничное блюдо',
+                cooking_time=5, image=SYNTHETIC_IMAGE
+            )
+
+    def search(self, query):
+        response = self.clients['anonymous'].get(
+            '/api/recipes/', {'search': query, 'limit': 50}
+        )
+        return {recipe['name'] for recipe in response.json()['results']}
+
+    def test_prefix_search(self):
+        self.assertEqual(
+            self.search('ёлоч'), {'Ёлочный пирог', 'Елочка из теста'}
+        )
+        self.assertEqual(self.search('ел тест'), {'Елочка из теста'})
+        self.assertEqual(self.search('елочныйй'), set())
+
+    def test_search_with_filters(self):
+        first, second = self.tags[:2]
+        pie, fir_tree, fir = (
+            Recipe.objects.get(name=name)
+            for name in ('Ёлочный пирог', 'Елочка из теста', 'Ель')
+        )
+        pie.tags.set([first, second])
+        fir_tree.tags.set([first])
+        fir.tags.set([second])
+        Favorite.objects.create(user=self.user, recipe=fir_tree)
+        client = self.clients['authenticated']
+        for query, expected in (
+            ({'tags': first.slug}, {'Ёлочный пирог', 'Елочка из теста'}),
+            ({'tags': [first.slug, second.slug], 'tags_mode': 'all'},
+             {'Ёлочный пирог'}),
+            ({'is_favorited': 1}, {'Елочка из теста'}),
+            ({'author': self.user.id, 'tags': second.slug},
+             {'Ёлочный пирог'}),
+            ({'cursor': '', 'tags': first.slug},
+             {'Ёлочный пирог', 'Елочка из теста'}),
+        ):
+            with self.subTest(query=query):
+                response = client.get(
+                    '/api/recipes/', {'search': 'ёлоч', 'limit': 50, **query}
+                )
+                names = [
+                    recipe['name'] for recipe in response.json()['results']
+                ]
+                self.assertEqual(len(names), len(set(names)))
+                self.assertEqual(set(names), expected)
+
+    @skipUnless(connection.vendor == 'postgresql', 'только для PostgreSQL')
+    def test_token_column_uses_binary_collation(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT collation_name FROM information_schema.columns '
+                'WHERE table_name = %s AND column_name = %s',
+                [RecipeSearchToken._meta.db_table, 'token']
+            )
+            self.assertEqual(cursor.fetchone(), ('C',))
+
+
+class SubscriptionsTests(RecipeDataTestCase):
+    url = '/api/users/subscriptions/'
+
+    def setUp(self):
+        super().setUp()
+        Follow.objects.filter(follower=self.user).delete()
+        for author in User.objects.exclude(pk=self.user.pk):
+            Follow.objects.create(follower=self.user, following=author)
+        call_command('reconcile_counters', stdout=StringIO())
+        self.client = self.clients['authenticated']
+
+    def get(self, query):
+        return self.client.get(f'{self.url}?{query}')
+
+    def test_query_count_does_not_grow_with_limits(self):
+        for mode, query in (
+            ('page', 'limit=1&recipes_limit=1'),
+            ('page', 'limit=6&recipes_limit=3'),
+            ('page', 'limit=50'),
+            ('cursor', 'cursor=&limit=1&recipes_limit=1'),
+            ('cursor', 'cursor=&limit=50'),
+        ):
+            with self.subTest(query=query):
+                cache.clear()
+                token_cache.invalidate(self.token.key)
+                with self.assertNumQueries(SUBSCRIPTIONS_QUERIES[mode]):
+                    response = self.get(query)
+                self.assertEqual(response.status_code, 200)
+
+    def test_recipes_limit_returns_newest_recipes(self):
+        for limit in (0, 1, 3):
+            with self.subTest(limit=limit):
+                response = self.get(f'limit=50&recipes_limit={limit}')
+                for author in response.json()['results']:
+                    newest = list(Recipe.objects.filter(
+                        author_id=author['id']
+                    ).order_by('-pub_date', '-id').values_list(
+                        'id', flat=True
+                    )[:limit])
+                    self.assertEqual(
+                        [recipe['id'] for recipe in author['recipes']], newest
+                    )
+                    self.assertEqual(
+                        author['recipes_count'],
+                        Recipe.objects.filter(author_id=author['id']).count()
+                    )
+
+    def test_invalid_recipes_limit_is_rejected(self):
+        for limit in ('x', '-1', '1.5', ''):
+            with self.subTest(limit=limit):
+                response = self.get(f'recipes_limit={limit}')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('recipes_limit', response.json())
@@ -1,8 +1,8 @@
 from django.urls import include, path, re_path
 from rest_framework.routers import DefaultRouter
 
-from .views import (IngredientViewSet, RecipeViewSet, SubscriptionsViewSet,
-                    TagViewSet, UserViewSet)
+from .views import (IngredientViewSet, MetricsView, RecipeViewSet,
+                    SubscriptionsViewSet, TagViewSet, UserViewSet)
 
 app_name = 'api'
 
@@ -35,6 +35,7 @@ router.register(
 )
 
 urlpatterns = [
+    path('metrics', MetricsView.as_view(), name='metrics'),
     path('', include(router_1.urls)),
     path('', include('djoser.urls')),
     path('', include(router.urls)),
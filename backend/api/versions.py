@@ -0,0 +1,25 @@
+from uuid import uuid4
+
+from django.core.cache import caches
+from django.utils.connection import ConnectionProxy
+
+CATALOGUE_VERSION_KEY = 'catalogue-version'
+RECIPES_VERSION_KEY = 'recipes-version'
+
+cache = ConnectionProxy(caches, 'versions')
+
+
+def get_version(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid4().hex, None)
+        return cache.get(key)
+    return version
+
+
+def bump_version(key):
+    cache.set(key, uuid4().hex, None)
+
+
+def bump_versions(keys):
+    cache.set_many({key: uuid4().hex for key in keys}, None)
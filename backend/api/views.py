@@ -1,25 +1,52 @@
-import datetime
+from urllib.parse import urlencode
 
-from django.shortcuts import HttpResponse, get_object_or_404
+from django.db.models import OuterRef, Prefetch, Subquery
+from django.http import FileResponse, JsonResponse
+from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from .catalogue import CatalogueCacheMixin
+from .counters import add_to_list, remove_from_list
 from .filters import AuthorTagFilter, IngredientFilter
-from .pagination import LimitPageNumberPagination
+from .ingredient_index import ingredient_index
+from .metrics import expose
+from .page_cache import AnonymousPageCacheMixin, invalidate_recipe_pages
+from .pagination import (LimitPageNumberOrCursorPagination,
+                         LimitPageNumberPagination)
 from .permissions import IsAdminOrReadOnly, IsOwnerOrReadOnly
+from .recipe_rendering import FastRecipeRenderingMixin
+from .renderers import CSVRenderer, PDFRenderer, PlainTextRenderer
 from .serializers import (CustomUserCreateSerializer, CustomUserSerializer,
                           FollowSerializer, IngredientSerializer,
-                          RecipeListSerializer, RecipeSerializer,
-                          ShortRecipeSerializer, TagSerializer)
-from recipes.models import (Favorite, Ingredient, IngredientAmount, Recipe,
-                            ShoppingCart, Tag)
+                          RecipeIdsSerializer, RecipeListSerializer,
+                          RecipeSerializer, ShortRecipeSerializer,
+                          TagSerializer, get_recipes_limit)
+from .shopping_documents import (BACKGROUND_FORMATS, build_document,
+                                 get_cart_version, get_document_path,
+                                 open_document, pop_document_error,
+                                 schedule_document)
+from .shopping_list import CONTENT_TYPES, FILENAME, RENDERERS
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
 from users.models import Follow, User
 
+RECIPES_NOT_FOUND = 'Рецепты не найдены: {ids}'
+SHOPPING_LIST_PENDING = 'Список покупок готовится, повторите запрос позже'
+SHOPPING_LIST_FAILED = 'Не удалось подготовить список покупок'
+SHOPPING_LIST_RETRY_AFTER = 2
+SHOPPING_LIST_RENDERERS = [
+    renderer
+    for renderer in (PlainTextRenderer, CSVRenderer, JSONRenderer, PDFRenderer)
+    if renderer.format in RENDERERS
+]
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+
+class IngredientViewSet(CatalogueCacheMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = IngredientSerializer
     queryset = Ingredient.objects.all()
     permission_classes = (IsAdminOrReadOnly,)
@@ -27,25 +54,75 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     filter_class = IngredientFilter
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if name:
+            return Response(
+                ingredient_index.search(name, self.catalogue_version)
+            )
+        return super().list(request, *args, **kwargs)
+
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(CatalogueCacheMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = TagSerializer
     queryset = Tag.objects.all()
     permission_classes = (IsAdminOrReadOnly,)
     pagination_class = None
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(AnonymousPageCacheMixin, FastRecipeRenderingMixin,
+                    viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
     permission_classes = (IsOwnerOrReadOnly,)
     filter_class = AuthorTagFilter
-    pagination_class = LimitPageNumberPagination
+    pagination_class = LimitPageNumberOrCursorPagination
+    lookup_value_regex = r'\d+'
+
+    def get_queryset(self):
+        queryset = Recipe.objects.with_user_flags(self.request.user)
+        if self.use_fast_rendering():
+            return queryset
+        return queryset.with_related()
 
     def get_serializer_class(self):
         if self.action in ('list', 'retrieve'):
             return RecipeListSerializer
         return RecipeSerializer
 
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        invalidate_recipe_pages()
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        invalidate_recipe_pages()
+
+    def get_batch_recipe_ids(self):
+        serializer = RecipeIdsSerializer(data=self.request.data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data['recipes']
+
+    def add_to_list(self, model, recipes):
+        add_to_list(model, self.request.user, recipes)
+        serializer = ShortRecipeSerializer(recipes, many=True)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def add_batch_to_list(self, model):
+        recipe_ids = self.get_batch_recipe_ids()
+        recipes = list(Recipe.objects.filter(id__in=recipe_ids))
+        missing = set(recipe_ids) - {recipe.id for recipe in recipes}
+        if missing:
+            return Response({
+                'errors': RECIPES_NOT_FOUND.format(
+                    ids=', '.join(map(str, sorted(missing)))
+                )
+            }, status=status.HTTP_400_BAD_REQUEST)
+        return self.add_to_list(model, recipes)
+
+    def remove_from_list(self, model, recipe_ids):
+        remove_from_list(model, self.request.user, recipe_ids)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
     @action(
         detail=True,
         methods=['post'],
@@ -53,44 +130,24 @@ class RecipeViewSet(viewsets.ModelViewSet):
     )
     def favorite(self, request, pk=None):
         recipe = get_object_or_404(Recipe, pk=pk)
-        if Favorite.objects.filter(
-            recipe=recipe,
-            user=request.user
-        ).exists():
-            return Response({
-                'errors': f'{recipe} уже находится в вашем избранном!'
-            }, status=status.HTTP_400_BAD_REQUEST)
-        Favorite.objects.create(
-            recipe=recipe,
-            user=request.user
-        )
-        serializer = ShortRecipeSerializer(
-            Recipe.objects.filter(id=pk),
-            many=True
-        )
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return self.add_to_list(Favorite, [recipe])
 
     @favorite.mapping.delete
     def del_favorite(self, request, pk=None):
-        recipe = get_object_or_404(Recipe, pk=pk)
+        return self.remove_from_list(Favorite, [pk])
 
-        if not Favorite.objects.filter(
-            recipe=recipe,
-            user=request.user
-        ).exists():
-            return Response({
-                'errors': f'{recipe} не находится в вашем избранном!'
-            }, status=status.HTTP_400_BAD_REQUEST)
+    @action(
+        detail=False,
+        methods=['post'],
+        url_path='favorite',
+        permission_classes=[IsAuthenticated]
+    )
+    def favorite_batch(self, request):
+        return self.add_batch_to_list(Favorite)
 
-        Favorite.objects.filter(
-            recipe=recipe,
-            user=request.user
-        ).delete()
-
-        return Response(
-            {f'{recipe} Успешно удален из избраного!'},
-            status=status.HTTP_204_NO_CONTENT
-        )
+    @favorite_batch.mapping.delete
+    def del_favorite_batch(self, request):
+        return self.remove_from_list(Favorite, self.get_batch_recipe_ids())
 
     @action(
         detail=True,
@@ -99,79 +156,73 @@ class RecipeViewSet(viewsets.ModelViewSet):
     )
     def shopping_cart(self, request, pk=None):
         recipe = get_object_or_404(Recipe, pk=pk)
-        if ShoppingCart.objects.filter(
-            recipe=recipe,
-            user=request.user
-        ).exists():
-            return Response({
-                'errors': f'{recipe} уже находится в вашем избранном!'
-            }, status=status.HTTP_400_BAD_REQUEST)
-        ShoppingCart.objects.create(
-            recipe=recipe,
-            user=request.user
-        )
-        serializer = ShortRecipeSerializer(
-            Recipe.objects.filter(id=pk),
-            many=True
-        )
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return self.add_to_list(ShoppingCart, [recipe])
 
     @shopping_cart.mapping.delete
     def del_shopping_cart(self, request, pk=None):
-        recipe = get_object_or_404(Recipe, pk=pk)
-
-        if not ShoppingCart.objects.filter(
-            recipe=recipe,
-            user=request.user
-        ).exists():
-            return Response({
-                'errors': f'{recipe} не находится в вашем списке покупок!'
-            }, status=status.HTTP_400_BAD_REQUEST)
-
-        ShoppingCart.objects.filter(
-            recipe=recipe,
-            user=request.user
-        ).delete()
+        return self.remove_from_list(ShoppingCart, [pk])
 
-        return Response(
-            {f'{recipe} Успешно удален из списка покупок!'},
-            status=status.HTTP_204_NO_CONTENT
+    @action(
+        detail=False,
+        methods=['post'],
+        url_path='shopping_cart',
+        permission_classes=[IsAuthenticated]
+    )
+    def shopping_cart_batch(self, request):
+        return self.add_batch_to_list(ShoppingCart)
+
+    @shopping_cart_batch.mapping.delete
+    def del_shopping_cart_batch(self, request):
+        return self.remove_from_list(
+            ShoppingCart,
+            self.get_batch_recipe_ids()
         )
 
     @action(
         detail=False,
         methods=['get'],
-        permission_classes=[IsAuthenticated]
+        permission_classes=[IsAuthenticated],
+        renderer_classes=SHOPPING_LIST_RENDERERS
     )
     def download_shopping_cart(self, request):
-        shopping_list = {}
-        ingredients = IngredientAmount.objects.select_related(
-            'recipe', 'ingredient'
-        ).filter(recipe__shopping_carts__user=request.user)
-
-        for ingredient in ingredients:
-            amount = ingredient.amount
-            name = ingredient.ingredient.name
-            measurement_unit = ingredient.ingredient.measurement_unit
-            if name not in shopping_list:
-                shopping_list[name] = {
-                    'measurement_unit': measurement_unit,
-                    'amount': amount
-                }
-            else:
-                shopping_list[name]['amount'] += amount
-        main_list = (
-            [f"* {item}: {value['amount']}"
-             f" {value['measurement_unit']};\n"
-             for item, value in shopping_list.items()]
+        file_format = request.accepted_renderer.format
+        user_id = request.user.id
+        version = get_cart_version(user_id)
+        document = open_document(
+            get_document_path(user_id, version, file_format)
+        )
+        if document is None and file_format in BACKGROUND_FORMATS:
+            if pop_document_error(user_id, version, file_format):
+                return JsonResponse(
+                    {'errors': SHOPPING_LIST_FAILED},
+                    status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    json_dumps_params={'ensure_ascii': False}
+                )
+            schedule_document(user_id, version, file_format)
+            return self.shopping_list_pending(request, file_format)
+        if document is None:
+            document = open(
+                build_document(user_id, version, file_format), 'rb'
+            )
+        return FileResponse(
+            document,
+            as_attachment=True,
+            filename=f'{FILENAME}.{file_format}',
+            content_type=CONTENT_TYPES[file_format]
+        )
+
+    @staticmethod
+    def shopping_list_pending(request, file_format):
+        url = request.build_absolute_uri(
+            f'{request.path}?{urlencode({"format": file_format})}'
         )
-        main_list.append(
-            f'\n FoodGram, connecting people (｡◕‿◕｡)'
-            f'\n {datetime.date.today().year}'
+        response = JsonResponse(
+            {'detail': SHOPPING_LIST_PENDING, 'url': url},
+            status=status.HTTP_202_ACCEPTED,
+            json_dumps_params={'ensure_ascii': False}
         )
-        response = HttpResponse(main_list, 'Content-Type: text/plain')
-        response['Content-Disposition'] = (
-            'attachment; filename="ShoppingList.txt"')
+        response['Location'] = url
+        response['Retry-After'] = SHOPPING_LIST_RETRY_AFTER
         return response
 
 
@@ -251,10 +302,36 @@ class UserViewSet(viewsets.ModelViewSet):
 
 class SubscriptionsViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Follow.objects.all()
-    pagination_class = LimitPageNumberPagination
+    pagination_class = LimitPageNumberOrCursorPagination
+    cursor_ordering = ('-id',)
     permission_classes = [IsAuthenticated]
     serializer_class = FollowSerializer
 
     def get_queryset(self):
         follower = self.request.user
-        return Follow.objects.filter(follower=follower)
+        recipes_limit = get_recipes_limit(self.request)
+        limited_recipes = Recipe.objects.filter(pk__in=Subquery(
+            Recipe.objects.filter(
+                author=OuterRef('author')
+            ).order_by('-pub_date', '-id').values('pk')[:recipes_limit]
+        )).order_by('-pub_date', '-id')
+        return Follow.objects.filter(
+            follower=follower
+        ).select_related('following').order_by(
+            *self.cursor_ordering
+        ).prefetch_related(Prefetch(
+            'following__recipe_set',
+            queryset=limited_recipes,
+            to_attr='limited_recipes'
+        ))
+
+
+class MetricsView(APIView):
+    permission_classes = (IsAdminUser,)
+    renderer_classes = (PlainTextRenderer,)
+
+    def get(self, request):
+        return Response(
+            expose(),
+            content_type='text/plain; version=0.0.4; charset=utf-8'
+        )
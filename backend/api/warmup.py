@@ -0,0 +1,79 @@
+import logging
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.test import RequestFactory
+from django.urls import reverse
+from recipes.models import Tag
+
+from .ingredient_index import ingredient_index
+from .views import IngredientViewSet, RecipeViewSet, TagViewSet
+
+RECIPES_PAGE_LIMIT = 6
+
+logger = logging.getLogger(__name__)
+
+hooks = []
+
+
+def warmup_hook(function):
+    hooks.append(function)
+    return function
+
+
+def get(view, url_name, params=None):
+    request = RequestFactory().get(
+        reverse(url_name),
+        params or {},
+        HTTP_HOST=settings.WARMUP_HOST
+    )
+    response = view(request)
+    if response.status_code != 200:
+        logger.warning(
+            'Прогрев %s вернул статус %s', request.path, response.status_code
+        )
+
+
+@warmup_hook
+def tags():
+    get(TagViewSet.as_view({'get': 'list'}, basename='tags'), 'api:tags-list')
+
+
+@warmup_hook
+def ingredients():
+    ingredient_index.get_snapshot()
+    get(
+        IngredientViewSet.as_view({'get': 'list'}, basename='ingredients'),
+        'api:ingredients-list'
+    )
+
+
+@warmup_hook
+def recipe_pages():
+    view = RecipeViewSet.as_view({'get': 'list'}, basename='recipes')
+    slugs = list(Tag.objects.values_list('slug', flat=True))
+    for page in range(1, settings.WARMUP_RECIPE_PAGES + 1):
+        params = {'page': page, 'limit': RECIPES_PAGE_LIMIT}
+        get(view, 'api:recipes-list', params)
+        get(view, 'api:recipes-list', {**params, 'tags': slugs})
+
+
+def connect_databases():
+    start = time.perf_counter()
+    for connection in connections.all():
+        connection.ensure_connection()
+    return time.perf_counter() - start
+
+
+def run_hooks():
+    timings = []
+    for hook in hooks:
+        start = time.perf_counter()
+        try:
+            hook()
+        except Exception:
+            logger.exception('Ошибка прогрева %s', hook.__name__)
+        timings.append((hook.__name__, time.perf_counter() - start))
+    connections.close_all()
+    return timings
@@ -0,0 +1,58 @@
+import os
+import time
+
+LAUNCH_TIME = time.monotonic()
+
+CPU_COUNT = len(os.sched_getaffinity(0))
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', default='False') == 'True'
+
+bind = os.getenv('GUNICORN_BIND', default='0:8000')
+preload_app = True
+workers = int(os.getenv('GUNICORN_WORKERS', default=CPU_COUNT * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', default=2))
+
+if ASYNC_VIEWS:
+    wsgi_app = 'foodgram.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'foodgram.wsgi:application'
+    worker_class = 'gthread' if threads > 1 else 'sync'
+
+
+def log_phase(log, phase, seconds):
+    log.info('Запуск: %s — %.1f мс', phase, seconds * 1000)
+
+
+def on_starting(server):
+    log_phase(
+        server.log,
+        'загрузка приложения',
+        time.monotonic() - LAUNCH_TIME
+    )
+
+
+def when_ready(server):
+    from api.warmup import run_hooks
+
+    start = time.monotonic()
+    for hook, seconds in run_hooks():
+        log_phase(server.log, f'прогрев {hook}', seconds)
+    log_phase(server.log, 'прогрев', time.monotonic() - start)
+
+
+def post_worker_init(worker):
+    from api.warmup import connect_databases
+
+    try:
+        log_phase(
+            worker.log,
+            f'подключение воркера {worker.pid} к базе',
+            connect_databases()
+        )
+    except Exception:
+        worker.log.exception('Воркер %s не подключился к базе', worker.pid)
+    log_phase(
+        worker.log,
+        f'воркер {worker.pid} готов',
+        time.monotonic() - LAUNCH_TIME
+    )
@@ -1,12 +1,20 @@
 from django.contrib import admin
+from django.db.models import Q
 
 from .models import (Favorite, Ingredient, IngredientAmount, Recipe,
                      ShoppingCart, Tag)
+from .search import get_matches, get_terms
 
 
 class RecipeIngredientInline(admin.TabularInline):
     model = IngredientAmount
     min_num = 1
+    autocomplete_fields = ('ingredient',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'ingredient', 'recipe__author'
+        )
 
 
 @admin.register(Recipe)
@@ -15,14 +23,27 @@ class RecipeAdmin(admin.ModelAdmin):
     list_display = (
         'name',
         'author',
+        'favorites_count',
     )
-    search_fields = (
-        'name',
-        'author',
-        'tags'
-    )
+    readonly_fields = ('favorites_count', 'in_carts_count')
+    autocomplete_fields = ('author',)
+    search_fields = ('^author__username',)
+    list_filter = ('tags',)
+    show_full_result_count = False
     empty_value_display = '-пусто-'
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('author')
+
+    def get_search_results(self, request, queryset, search_term):
+        terms = get_terms(search_term)
+        if not terms:
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(
+            Q(pk__in=get_matches(terms).values('recipe'))
+            | Q(author__username__istartswith=search_term.strip())
+        ), False
+
 
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
@@ -45,10 +66,35 @@ class IngredientAdmin(admin.ModelAdmin):
         'measurement_unit',
     )
     list_editable = ('name',)
-    list_filter = ('name',)
+    search_fields = ('^name',)
+    list_filter = ('measurement_unit',)
+    ordering = ('name', 'measurement_unit')
+    show_full_result_count = False
+    empty_value_display = '-пусто-'
+
+
+@admin.register(IngredientAmount)
+class IngredientAmountAdmin(admin.ModelAdmin):
+    list_display = (
+        'recipe',
+        'ingredient',
+        'amount',
+    )
+    list_select_related = ('recipe__author', 'ingredient')
+    autocomplete_fields = ('recipe', 'ingredient')
+    show_full_result_count = False
     empty_value_display = '-пусто-'
 
 
-admin.site.register(IngredientAmount)
-admin.site.register(ShoppingCart)
-admin.site.register(Favorite)
+@admin.register(Favorite, ShoppingCart)
+class RecipeListAdmin(admin.ModelAdmin):
+    list_display = (
+        'user',
+        'recipe',
+        'add_date',
+    )
+    list_select_related = ('user', 'recipe__author')
+    autocomplete_fields = ('user', 'recipe')
+    search_fields = ('^user__username',)
+    show_full_result_count = False
+    empty_value_display = '-пусто-'
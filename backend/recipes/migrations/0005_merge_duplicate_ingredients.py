@@ -0,0 +1,43 @@
+# Generated by Django 3.2.6 on 2026-10-18 04:38
+
+from django.db import migrations
+from django.db.models import Count, F, Min
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    IngredientAmount = apps.get_model('recipes', 'IngredientAmount')
+    duplicates = Ingredient.objects.values(
+        'name', 'measurement_unit'
+    ).annotate(keep_id=Min('id'), total=Count('id')).filter(total__gt=1)
+    for duplicate in duplicates:
+        keep_id = duplicate['keep_id']
+        duplicate_ids = list(Ingredient.objects.filter(
+            name=duplicate['name'],
+            measurement_unit=duplicate['measurement_unit'],
+        ).exclude(id=keep_id).values_list('id', flat=True))
+        amounts = IngredientAmount.objects.filter(
+            ingredient_id__in=duplicate_ids
+        )
+        for amount in amounts.order_by('id'):
+            if IngredientAmount.objects.filter(
+                recipe_id=amount.recipe_id, ingredient_id=keep_id
+            ).update(amount=F('amount') + amount.amount):
+                amount.delete()
+            else:
+                amount.ingredient_id = keep_id
+                amount.save(update_fields=['ingredient'])
+        Ingredient.objects.filter(id__in=duplicate_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_recipe_author_pub_date_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 3.2.6 on 2026-10-18 05:03
+
+import re
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+CHUNK_SIZE = 1000
+TOKEN_PATTERN = re.compile(r'\w+')
+MIN_TOKEN_LENGTH = 2
+MAX_TOKEN_LENGTH = 50
+NAME_WEIGHT = 3
+TEXT_WEIGHT = 1
+
+
+def tokenize(value):
+    value = ' '.join(value.casefold().replace('ё', 'е').split())
+    return {
+        token[:MAX_TOKEN_LENGTH]
+        for token in TOKEN_PATTERN.findall(value)
+        if len(token) >= MIN_TOKEN_LENGTH
+    }
+
+
+def get_tokens(name, text):
+    tokens = dict.fromkeys(tokenize(text), TEXT_WEIGHT)
+    for token in tokenize(name):
+        tokens[token] = tokens.get(token, 0) + NAME_WEIGHT
+    return tokens
+
+
+def index_recipes(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeSearchToken = apps.get_model('recipes', 'RecipeSearchToken')
+    last_id = 0
+    while True:
+        recipes = list(Recipe.objects.filter(id__gt=last_id).order_by(
+            'id'
+        ).values_list('id', 'name', 'text')[:CHUNK_SIZE])
+        if not recipes:
+            return
+        RecipeSearchToken.objects.bulk_create(
+            RecipeSearchToken(recipe_id=recipe_id, token=token, weight=weight)
+            for recipe_id, name, text in recipes
+            for token, weight in get_tokens(name, text).items()
+        )
+        last_id = recipes[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=50, verbose_name='Слово')),
+                ('weight', models.PositiveSmallIntegerField(default=1, verbose_name='Вес')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='recipes.recipe', verbose_name='Рецепт')),
+            ],
+            options={
+                'verbose_name': 'Слово поискового индекса',
+                'verbose_name_plural': 'Поисковый индекс рецептов',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='recipesearchtoken',
+            index=models.Index(fields=['token', 'recipe'], name='search_token_recipe_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='recipesearchtoken',
+            constraint=models.UniqueConstraint(fields=('recipe', 'token'), name='recipe_search_token_unique'),
+        ),
+        migrations.RunPython(index_recipes, migrations.RunPython.noop),
+    ]
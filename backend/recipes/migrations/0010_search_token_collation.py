@@ -0,0 +1,19 @@
+# Generated by Django 3.2.6 on 2026-10-18 05:57
+
+from django.db import migrations
+import recipes.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_ingredient_unique'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipesearchtoken',
+            name='token',
+            field=recipes.models.BinaryCollationCharField(max_length=50, verbose_name='Слово'),
+        ),
+    ]
@@ -1,9 +1,10 @@
 from django.core.validators import MinValueValidator, RegexValidator
 from django.db import models
+from django.db.models import Exists, OuterRef, Prefetch
 
 from .settings import (MAX_LENGTH_INGREDIENT_NAME, MAX_LENGTH_MEASUREMENT_UNIT,
                        MAX_LENGTH_RECIPE_NAME, MAX_LENGTH_RECIPE_TEXT,
-                       MAX_LENGTH_TAG_NAME)
+                       MAX_LENGTH_SEARCH_TOKEN, MAX_LENGTH_TAG_NAME)
 from users.models import User
 
 
@@ -55,11 +56,46 @@ class Ingredient(models.Model):
     class Meta:
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
+        constraints = [
+            models.UniqueConstraint(
+                name='ingredient_unique',
+                fields=['name', 'measurement_unit'],
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
 
+class RecipeQuerySet(models.QuerySet):
+
+    def with_related(self):
+        return self.prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.order_by('id')),
+            Prefetch(
+                'ingredientamount_set',
+                queryset=IngredientAmount.objects.select_related(
+                    'ingredient'
+                ).order_by('id')
+            )
+        )
+
+    def with_user_flags(self, user):
+        queryset = self.select_related('author')
+        if user.is_anonymous:
+            return queryset
+        return queryset.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                recipe=OuterRef('pk'),
+                user=user
+            )),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                recipe=OuterRef('pk'),
+                user=user
+            ))
+        )
+
+
 class Recipe(models.Model):
     DISPLAY = (
         '{name}, '
@@ -94,6 +130,10 @@ class Recipe(models.Model):
         verbose_name='Картинка',
         upload_to='recipes/images/',
     )
+    renditions_ready = models.BooleanField(
+        default=False,
+        verbose_name='Уменьшенные копии картинки готовы'
+    )
     cooking_time = models.PositiveIntegerField(
         default=1,
         validators=[MinValueValidator(1)],
@@ -103,11 +143,33 @@ class Recipe(models.Model):
         auto_now_add=True,
         verbose_name='Дата публикации'
     )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество добавлений в избранное'
+    )
+    in_carts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество добавлений в списки покупок'
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='recipe_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date'],
+                name='recipe_author_pub_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.DISPLAY.format(
@@ -116,6 +178,51 @@ class Recipe(models.Model):
         )
 
 
+class BinaryCollationCharField(models.CharField):
+
+    def db_type(self, connection):
+        db_type = super().db_type(connection)
+        if connection.vendor == 'postgresql':
+            return f'{db_type} COLLATE "C"'
+        return db_type
+
+
+class RecipeSearchToken(models.Model):
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='search_tokens',
+        verbose_name='Рецепт'
+    )
+    token = BinaryCollationCharField(
+        max_length=MAX_LENGTH_SEARCH_TOKEN,
+        verbose_name='Слово'
+    )
+    weight = models.PositiveSmallIntegerField(
+        default=1,
+        verbose_name='Вес'
+    )
+
+    class Meta:
+        verbose_name = 'Слово поискового индекса'
+        verbose_name_plural = 'Поисковый индекс рецептов'
+        constraints = [
+            models.UniqueConstraint(
+                name='recipe_search_token_unique',
+                fields=['recipe', 'token'],
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['token', 'recipe'],
+                name='search_token_recipe_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return self.token
+
+
 class IngredientAmount(models.Model):
     DISPLAY = (
         '{recipe}: '
@@ -0,0 +1,56 @@
+import re
+
+from django.db.models import Case, Count, F, IntegerField, Q, Sum, Value, When
+
+from .models import RecipeSearchToken
+from .settings import MAX_LENGTH_SEARCH_TOKEN
+
+TOKEN_PATTERN = re.compile(r'\w+')
+MIN_TOKEN_LENGTH = 2
+SEARCH_TERMS_MAX = 5
+EXACT_MATCH_FACTOR = 2
+TOKEN_END = '\U0010ffff'
+
+
+def normalize(value):
+    return ' '.join(value.casefold().replace('ё', 'е').split())
+
+
+def tokenize(value):
+    return {
+        token[:MAX_LENGTH_SEARCH_TOKEN]
+        for token in TOKEN_PATTERN.findall(normalize(value))
+        if len(token) >= MIN_TOKEN_LENGTH
+    }
+
+
+def get_terms(query):
+    terms = sorted(tokenize(query), key=len, reverse=True)
+    return [
+        term for index, term in enumerate(terms)
+        if not any(other.startswith(term) for other in terms[:index])
+    ][:SEARCH_TERMS_MAX]
+
+
+def get_matches(terms):
+    prefixes = [
+        Q(token__gte=term, token__lt=term + TOKEN_END) for term in terms
+    ]
+    matched = Q()
+    for prefix in prefixes:
+        matched |= prefix
+    return RecipeSearchToken.objects.filter(matched).values(
+        'recipe'
+    ).annotate(
+        terms=Count(Case(
+            *(When(prefix, then=Value(index))
+              for index, prefix in enumerate(prefixes)),
+            output_field=IntegerField()
+        ), distinct=True),
+        rank=Sum(Case(
+            *(When(token=term, then=F('weight') * EXACT_MATCH_FACTOR)
+              for term in terms),
+            default=F('weight'),
+            output_field=IntegerField()
+        ))
+    ).filter(terms=len(terms))
@@ -7,3 +7,5 @@ MAX_LENGTH_INGREDIENT_NAME = 200
 MAX_LENGTH_MEASUREMENT_UNIT = 200
 
 MAX_LENGTH_TAG_NAME = 200
+
+MAX_LENGTH_SEARCH_TOKEN = 50
@@ -10,8 +10,10 @@ class UserAdmin(admin.ModelAdmin):
         'email',
         'first_name',
         'last_name',
+        'recipes_count',
+        'followers_count',
     )
-    search_fields = ('name',)
+    search_fields = ('^username', '^email')
     empty_value_display = '-пусто-'
 
 
@@ -21,5 +23,8 @@ class FollowAdmin(admin.ModelAdmin):
         'following',
         'follower',
     )
-    search_fields = ('following',)
+    list_select_related = ('following', 'follower')
+    autocomplete_fields = ('following', 'follower')
+    search_fields = ('^following__username', '^follower__username')
+    show_full_result_count = False
     empty_value_display = '-пусто-'
@@ -43,6 +43,16 @@ class User(AbstractUser):
         choices=ROLES,
         default=USER
     )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество рецептов'
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество подписчиков'
+    )
 
     @property
     def is_admin(self):